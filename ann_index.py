@@ -0,0 +1,98 @@
+import numpy as np
+
+from config import LSH_TABLES, LSH_BITS, LSH_PROBES
+
+FIT_CHUNK_SIZE = 65536
+
+
+class LSHIndex:
+    """Random-projection (SimHash) LSH over L2-normalised sparse vectors.
+
+    Every table hashes a vector to the sign pattern of ``n_bits`` random
+    projections. A query is compared exactly only against the documents that
+    share a bucket with it in at least one table. ``probes=1`` also visits the
+    buckets one bit away. More tables and probes raise recall; more bits make
+    buckets smaller and queries faster.
+    """
+
+    def __init__(self, n_tables=LSH_TABLES, n_bits=LSH_BITS, probes=LSH_PROBES, seed=0):
+        if n_bits > 62:
+            raise ValueError("n_bits must be at most 62")
+        self.n_tables = n_tables
+        self.n_bits = n_bits
+        self.probes = probes
+        self.seed = seed
+        self.vectors = None
+        self.planes = None
+        self.sorted_keys = []
+        self.sorted_ids = []
+
+    def _hash(self, vectors):
+        projected = np.asarray(vectors @ self.planes)
+        bits = (projected > 0).reshape(-1, self.n_tables, self.n_bits)
+        weights = np.left_shift(np.int64(1), np.arange(self.n_bits, dtype=np.int64))
+        return bits.astype(np.int64) @ weights
+
+    def fit(self, vectors):
+        self.vectors = vectors.tocsr()
+        rng = np.random.default_rng(self.seed)
+        self.planes = rng.standard_normal(
+            (vectors.shape[1], self.n_tables * self.n_bits)
+        ).astype(np.float32)
+
+        keys = np.concatenate([
+            self._hash(self.vectors[start:start + FIT_CHUNK_SIZE])
+            for start in range(0, self.vectors.shape[0], FIT_CHUNK_SIZE)
+        ]) if self.vectors.shape[0] else np.zeros((0, self.n_tables), dtype=np.int64)
+
+        self.sorted_keys = []
+        self.sorted_ids = []
+        for table in range(self.n_tables):
+            order = np.argsort(keys[:, table], kind='stable')
+            self.sorted_keys.append(keys[order, table])
+            self.sorted_ids.append(order)
+        return self
+
+    def _probe_keys(self, keys):
+        if self.probes < 1:
+            return keys[:, :, None]
+        flips = np.left_shift(np.int64(1), np.arange(self.n_bits, dtype=np.int64))
+        neighbours = keys[:, :, None] ^ flips[None, None, :]
+        return np.concatenate([keys[:, :, None], neighbours], axis=2)
+
+    def candidates(self, query_vectors):
+        probe_keys = self._probe_keys(self._hash(query_vectors))
+        bounds = [
+            (np.searchsorted(self.sorted_keys[t], probe_keys[:, t, :], side='left'),
+             np.searchsorted(self.sorted_keys[t], probe_keys[:, t, :], side='right'))
+            for t in range(self.n_tables)
+        ]
+
+        for q in range(probe_keys.shape[0]):
+            parts = [
+                self.sorted_ids[t][lo:hi]
+                for t, (los, his) in enumerate(bounds)
+                for lo, hi in zip(los[q], his[q]) if hi > lo
+            ]
+            yield np.unique(np.concatenate(parts)) if parts else np.zeros(0, dtype=np.intp)
+
+    def search(self, query_vectors, k):
+        """Return ``(indices, scores)`` of shape ``(n_queries, k)``, best first.
+
+        Rows with fewer than ``k`` candidates are padded with index 0 and score 0.
+        """
+        n_queries = query_vectors.shape[0]
+        top_indices = np.zeros((n_queries, k), dtype=np.intp)
+        top_scores = np.zeros((n_queries, k))
+
+        for q, candidate_ids in enumerate(self.candidates(query_vectors)):
+            if len(candidate_ids) == 0:
+                continue
+            scores = (self.vectors[candidate_ids] @ query_vectors[q].T).toarray().ravel()
+            n = min(k, len(scores))
+            best = np.argpartition(-scores, n - 1)[:n] if n < len(scores) else np.arange(n)
+            best = best[np.argsort(-scores[best], kind='stable')]
+            top_indices[q, :n] = candidate_ids[best]
+            top_scores[q, :n] = scores[best]
+
+        return top_indices, top_scores
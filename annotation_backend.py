@@ -0,0 +1,60 @@
+class AnnotationBackend:
+    """Interface shared by the browser-driven and the REST API annotation backends."""
+
+    # True when answers are buffered and sent in bulk by the backend itself
+    batches_answers = False
+    # True when peek_texts can see tasks queued after the current one
+    supports_peek = False
+
+    def get_current_text(self):
+        raise NotImplementedError
+
+    def peek_texts(self, n):
+        # Texts of the current task and the ones queued after it, up to n.
+        # Backends that only ever see the task on screen return nothing.
+        return []
+
+    def current_task_hash(self):
+        # Prodigy's hash of the current task, or None when the backend only sees its text
+        return None
+
+    def process_multiple_labels(self, labels_list):
+        raise NotImplementedError
+
+    def submit_task(self):
+        raise NotImplementedError
+
+    def apply_labels_and_submit(self, labels_list):
+        # Backends that can label and accept in one step override this
+        if not self.process_multiple_labels(labels_list):
+            print("❌ Gagal process labels")
+            return False
+
+        print(f"✅ Berhasil process {len(labels_list)} labels")
+        return self.submit_task()
+
+    def click_ignore(self):
+        raise NotImplementedError
+
+    def auto_save_progress(self):
+        raise NotImplementedError
+
+    def check_no_tasks(self):
+        raise NotImplementedError
+
+    def unsaved_count(self):
+        # Answers submitted but not yet saved, or None when the backend can't tell
+        return None
+
+    def recycle_due(self, succeeded):
+        # Reason the browser behind this backend should be replaced after a task, or None
+        return None
+
+    def recycle(self, reason):
+        pass
+
+    def report_timings(self):
+        pass
+
+    def close(self):
+        pass
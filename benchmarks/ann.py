@@ -0,0 +1,121 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from ann_index import LSHIndex
+from config import (
+    DATASET_PATHS, SIMILARITY_THRESHOLD, TFIDF_MAX_FEATURES, TFIDF_NGRAM_RANGE, LSH_TABLES, LSH_BITS, LSH_PROBES
+)
+from data_processor import load_all_datasets, extract_non_neutral_labels
+from inverted_index import InvertedIndex
+
+CONFIGS = [
+    (8, 12, 1),
+    (16, 10, 1),
+    (16, 8, 1),
+    (32, 8, 1),
+    (64, 7, 0),
+]
+
+
+def synthetic_corpus(sentences, n_docs, seed=0):
+    # Sample documents from the real unigram distribution so the TF-IDF
+    # vectors have the same sparsity as the labelled data
+    rng = np.random.default_rng(seed)
+    tokens = " ".join(sentences).lower().split()
+    vocabulary, counts = np.unique(tokens, return_counts=True)
+    probabilities = counts / counts.sum()
+    lengths = rng.integers(8, 30, size=n_docs)
+    words = rng.choice(vocabulary, size=lengths.sum(), p=probabilities)
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+    return [" ".join(words[offsets[i]:offsets[i + 1]]) for i in range(n_docs)]
+
+
+def exact_search(vectors, queries, k):
+    similarities = (queries @ vectors.T).toarray()
+    top = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+    return top, np.take_along_axis(similarities, top, axis=1)
+
+
+def recall_at_k(exact_indices, exact_scores, ann_indices):
+    found = 0
+    relevant = 0
+    for row_exact, row_scores, row_ann in zip(exact_indices, exact_scores, ann_indices):
+        # Only neighbours above the threshold can contribute label votes
+        wanted = set(row_exact[row_scores > SIMILARITY_THRESHOLD].tolist())
+        relevant += len(wanted)
+        found += len(wanted & set(row_ann.tolist()))
+    return found / relevant if relevant else 1.0
+
+
+def real_corpus(n_docs):
+    # The documents RAGHandler indexes, optionally grown with synthetic ones;
+    # the validation sentences are held out as queries
+    knowledge_data = extract_non_neutral_labels(load_all_datasets(DATASET_PATHS))
+    sentences = list(dict.fromkeys(entry['text'] for entry in knowledge_data))
+    corpus = sentences + synthetic_corpus(sentences, n_docs) if n_docs else sentences
+    return corpus, pd.read_csv("valid_preprocess.csv")['sentence'].astype(str).tolist()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall@k and QPS of the search backends against exact search")
+    parser.add_argument("--docs", type=int, default=None,
+                        help="synthetic documents in the corpus (default 100000, or none with --real)")
+    parser.add_argument("--real", action="store_true",
+                        help="index the knowledge base and query it with the validation sentences")
+    parser.add_argument("-k", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.real:
+        corpus, query_texts = real_corpus(args.docs or 0)
+    else:
+        sentences = load_all_datasets(DATASET_PATHS + ["valid_preprocess.csv"])['sentence'].tolist()
+        corpus = sentences + synthetic_corpus(sentences, 100_000 if args.docs is None else args.docs)
+        query_texts = pd.read_csv("valid_preprocess.csv")['sentence'].tolist() + sentences[:400]
+
+    vectorizer = TfidfVectorizer(max_features=TFIDF_MAX_FEATURES, ngram_range=TFIDF_NGRAM_RANGE, lowercase=True)
+    vectors = vectorizer.fit_transform(corpus)
+    queries = vectorizer.transform(query_texts)
+    print(f"Corpus: {vectors.shape[0]} documents, {queries.shape[0]} queries, k={args.k}, "
+          f"recall over exact neighbours above {SIMILARITY_THRESHOLD}")
+
+    start = time.perf_counter()
+    exact_indices, exact_scores = exact_search(vectors, queries, args.k)
+    exact_qps = queries.shape[0] / (time.perf_counter() - start)
+
+    print(f"{'backend':<22} {'build':>8} {'qps':>9} {'recall@k':>9} {'scanned':>8}")
+    print(f"{'exact':<22} {'-':>8} {exact_qps:>9.0f} {1.0:>9.3f} {1.0:>8.2f}")
+
+    start = time.perf_counter()
+    index = InvertedIndex(SIMILARITY_THRESHOLD).fit(vectors)
+    build_time = time.perf_counter() - start
+    start = time.perf_counter()
+    inverted_indices, _ = index.search(queries, args.k)
+    qps = queries.shape[0] / (time.perf_counter() - start)
+    recall = recall_at_k(exact_indices, exact_scores, inverted_indices)
+    print(f"{'inverted':<22} {build_time:>7.2f}s {qps:>9.0f} {recall:>9.3f} {'-':>8}")
+
+    configs = CONFIGS if (LSH_TABLES, LSH_BITS, LSH_PROBES) in CONFIGS else CONFIGS + [(LSH_TABLES, LSH_BITS, LSH_PROBES)]
+    for n_tables, n_bits, probes in configs:
+        start = time.perf_counter()
+        index = LSHIndex(n_tables, n_bits, probes).fit(vectors)
+        build_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        ann_indices, _ = index.search(queries, args.k)
+        qps = queries.shape[0] / (time.perf_counter() - start)
+
+        recall = recall_at_k(exact_indices, exact_scores, ann_indices)
+        # Share of the corpus each query ranks exactly
+        scanned = np.mean([len(ids) for ids in index.candidates(queries)]) / vectors.shape[0]
+        name = f"lsh t={n_tables} b={n_bits} p={probes}"
+        if (n_tables, n_bits, probes) == (LSH_TABLES, LSH_BITS, LSH_PROBES):
+            name += " *"
+        print(f"{name:<22} {build_time:>7.2f}s {qps:>9.0f} {recall:>9.3f} {scanned:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import argparse
+import contextlib
+import io
+import time
+
+from index_store import load_or_build_index
+from main import create_backend, run_full_automation
+from mock_prodigy import start_mock_server
+from rag_handler import RAGHandler
+
+
+def answer_accuracy(tasks, answers):
+    gold = {task['_task_hash']: set(task['gold']) for task in tasks}
+    true_positives = predicted = relevant = exact = 0
+
+    for answer in answers:
+        expected = gold.get(answer.get('_task_hash'), set())
+        labels = set(answer.get('accept', [])) if answer.get('answer') == 'accept' else set()
+        true_positives += len(labels & expected)
+        predicted += len(labels)
+        relevant += len(expected)
+        exact += labels == expected
+
+    precision = true_positives / predicted if predicted else 0.0
+    recall = true_positives / relevant if relevant else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {
+        'answers': len(answers),
+        'precision': precision,
+        'recall': recall,
+        'f1': f1,
+        'exact_match': exact / len(answers) if answers else 0.0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end run of the automation against a local mock Prodigy")
+    parser.add_argument("--backend", choices=["selenium", "api"], default="selenium")
+    parser.add_argument("--tasks", type=int, default=90, help="stop after this many tasks")
+    parser.add_argument("--latency", type=float, default=0.0, help="mock response latency in seconds")
+    parser.add_argument("--repeat", type=int, default=1, help="copies of valid_preprocess.csv in the feed")
+    parser.add_argument("--delay", type=float, default=0.0, help="pause between tasks (DELAY_BETWEEN_TASKS)")
+    parser.add_argument("--lookahead", type=int, default=None, help="prefetch depth, defaults to the config")
+    args = parser.parse_args()
+
+    rag = RAGHandler()
+    with contextlib.redirect_stdout(io.StringIO()):
+        load_or_build_index(rag)
+
+    server = start_mock_server(latency=args.latency, repeat=args.repeat)
+    host, port = server.server_address[:2]
+    url = f"http://{host}:{port}/?session=bench"
+    print(f"🧪 Mock Prodigy at {url} ({len(server.state.tasks)} tasks, backend={args.backend})")
+
+    prodigy = None
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            prodigy = create_backend(args.backend, url)
+            options = {} if args.lookahead is None else {'lookahead': args.lookahead}
+            start = time.perf_counter()
+            stats = run_full_automation(prodigy, rag, max_tasks=args.tasks, delay=args.delay, **options)
+            elapsed = time.perf_counter() - start
+            prodigy.close()
+            prodigy = None
+    finally:
+        if prodigy:
+            prodigy.close()
+        server.shutdown()
+
+    accuracy = answer_accuracy(server.state.tasks, server.state.answers)
+    print(f"\n📈 {stats['tasks']} tasks in {elapsed:.2f}s: {stats['tasks'] / elapsed:.2f} tasks/sec "
+          f"({stats['successes']} successful, {stats['errors']} errors)")
+    print(f"🎯 {accuracy['answers']} answers saved: precision={accuracy['precision']:.3f} "
+          f"recall={accuracy['recall']:.3f} f1={accuracy['f1']:.3f} exact={accuracy['exact_match']:.3f}")
+    # Tasks handed to a page that never answered them: the batch a recycled browser held,
+    # plus whatever the last one had queued when the run stopped
+    held = server.state.position - len(server.state.answers)
+    print(f"📤 {server.state.position} tasks served, {held} never answered")
+
+    print(f"\n{'stage':<32} {'n':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'total s':>9}")
+    for row in sorted(stats['stages'], key=lambda row: -row['total_s']):
+        print(f"{row['stage']:<32} {row['count']:>5} {row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} "
+              f"{row['p99_ms']:>9.1f} {row['total_s']:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import argparse
+import time
+
+from data_processor import LABEL_COLUMNS, load_all_datasets, extract_label_frame, extract_non_neutral_labels
+
+
+def legacy_extract_non_neutral_labels(df):
+    knowledge_data = []
+
+    for _, row in df.iterrows():
+        sentence = row['sentence']
+
+        for col in LABEL_COLUMNS:
+            label_value = row[col]
+
+            if label_value != 'neutral':
+                knowledge_data.append({
+                    'text': sentence,
+                    'aspect': col,
+                    'sentiment': label_value,
+                    'prodigy_label': f"{col}_{label_value}"
+                })
+
+    return knowledge_data
+
+
+def make_corpus(base_df, n_rows):
+    return base_df.sample(n=n_rows, replace=True, random_state=0).reset_index(drop=True)
+
+
+def time_call(func, df):
+    start = time.perf_counter()
+    result = func(df)
+    return time.perf_counter() - start, len(result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark knowledge extraction: iterrows vs columnar")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--legacy-limit", type=int, default=1_000_000,
+                        help="skip the iterrows baseline above this many rows")
+    args = parser.parse_args()
+
+    base_df = load_all_datasets()
+    print(f"{'rows':>10} {'entries':>10} {'iterrows':>10} {'frame':>10} {'records':>10} {'speedup':>8}")
+
+    for n_rows in args.sizes:
+        df = make_corpus(base_df, n_rows)
+
+        frame_time, entries = time_call(extract_label_frame, df)
+        records_time, _ = time_call(extract_non_neutral_labels, df)
+
+        if n_rows <= args.legacy_limit:
+            legacy_time, _ = time_call(legacy_extract_non_neutral_labels, df)
+            legacy_col = f"{legacy_time:>9.3f}s"
+            speedup = f"{legacy_time / frame_time:>7.1f}x"
+        else:
+            legacy_col = f"{'skipped':>10}"
+            speedup = f"{'-':>8}"
+
+        print(f"{n_rows:>10} {entries:>10} {legacy_col} {frame_time:>9.3f}s {records_time:>9.3f}s {speedup}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import argparse
+import contextlib
+import gc
+import io
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.ann import synthetic_corpus
+from config import DATASET_PATHS, LABEL_MAPPING
+from data_processor import load_all_datasets
+from rag_handler import RAGHandler
+
+MODES = [
+    ("standard", {}),
+    ("compact", {'compact_memory': True}),
+    ("compact+hashing", {'compact_memory': True, 'vectorizer': "hashing"}),
+]
+
+
+def synthetic_entries(corpus, seed=0):
+    # One to three labels per document, one knowledge entry per label, as in the real data
+    rng = np.random.default_rng(seed)
+    labels = list(LABEL_MAPPING)
+    entries = []
+    for text in corpus:
+        for label in rng.choice(labels, size=rng.integers(1, 4), replace=False):
+            aspect, sentiment = str(label).rsplit('_', 1)
+            entries.append({'text': text, 'aspect': aspect, 'sentiment': sentiment,
+                            'prodigy_label': f"{aspect}_{sentiment}"})
+    return entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bytes per knowledge entry of the standard and compact index")
+    parser.add_argument("--docs", type=int, default=200_000, help="synthetic documents on top of the real data")
+    parser.add_argument("-k", type=int, default=3)
+    args = parser.parse_args()
+
+    sentences = load_all_datasets(DATASET_PATHS)['sentence'].tolist()
+    corpus = sentences + synthetic_corpus(sentences, args.docs)
+    queries = pd.read_csv("valid_preprocess.csv")['sentence'].tolist()
+    print(f"Corpus: {len(corpus)} documents")
+
+    baseline = None
+    reference = None
+    print(f"{'mode':<16} {'entries':>9} {'MiB':>9} {'B/entry':>9} {'ratio':>7} {'build':>8} {'qps':>8} {'max |Δ|':>9}")
+    for name, options in MODES:
+        # Traced bytes still held once the build is done: the index plus whatever it kept of its input
+        gc.collect()
+        tracemalloc.start()
+        rag = RAGHandler("exact", **options)
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            rag.setup_vectorstore(synthetic_entries(corpus))
+        build_time = time.perf_counter() - start
+        gc.collect()
+        held, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        start = time.perf_counter()
+        _, scores = rag.predict_batch(queries, args.k)
+        qps = len(queries) / (time.perf_counter() - start)
+
+        report = rag.memory_report()
+        bytes_per_entry = held / report['entries']
+        baseline = baseline or bytes_per_entry
+        # Hashing changes the features, so only the vocabulary-based modes are compared
+        if reference is None:
+            reference = scores
+        drift = np.abs(scores - reference).max() if 'vectorizer' not in options else float('nan')
+        print(f"{name:<16} {report['entries']:>9} {held / 2**20:>9.1f} "
+              f"{bytes_per_entry:>9.0f} {baseline / bytes_per_entry:>6.1f}x "
+              f"{build_time:>7.1f}s {qps:>8.0f} {drift:>9.2g}")
+        # memory_report's estimate by part; the traced total above also counts allocator overhead
+        for part, nbytes in report['parts'].items():
+            print(f"   {part:<13} {nbytes / report['entries']:>8.1f} B/entry")
+        del rag
+
+
+if __name__ == "__main__":
+    main()
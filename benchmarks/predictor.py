@@ -0,0 +1,59 @@
+import argparse
+import contextlib
+import io
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.ann import synthetic_corpus
+from benchmarks.memory import synthetic_entries
+from config import DATASET_PATHS
+from data_processor import load_all_datasets, extract_non_neutral_labels
+from evaluation import VALID_PATH, evaluate
+from rag_handler import RAGHandler
+
+PREDICTORS = ["knn", "linear"]
+
+
+def single_query_latency(rag, queries, k):
+    # One query at a time, as find_labels_to_annotate issues them during a run
+    latencies = []
+    for text in queries:
+        start = time.perf_counter()
+        rag.predict_batch([text], k)
+        latencies.append(time.perf_counter() - start)
+    return np.percentile(latencies, [50, 95]) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency and F1 of the kNN and linear predictors as the index grows")
+    parser.add_argument("--docs", type=int, nargs="+", default=[0, 20_000, 100_000],
+                        help="synthetic documents added to the real knowledge base")
+    parser.add_argument("-k", type=int, default=3)
+    args = parser.parse_args()
+
+    knowledge_data = extract_non_neutral_labels(load_all_datasets(DATASET_PATHS))
+    sentences = list(dict.fromkeys(entry['text'] for entry in knowledge_data))
+    valid_df = pd.read_csv(VALID_PATH)
+    queries = valid_df['sentence'].astype(str).tolist()
+
+    print(f"{'predictor':<10} {'docs':>8} {'fit':>8} {'p50 ms':>8} {'p95 ms':>8} {'batch qps':>10} {'micro F1':>9} {'macro F1':>9}")
+    for n_docs in args.docs:
+        # Synthetic documents carry random labels: they only grow the index, so F1 drops with them
+        entries = knowledge_data + synthetic_entries(synthetic_corpus(sentences, n_docs)) if n_docs else knowledge_data
+        for predictor in PREDICTORS:
+            rag = RAGHandler(predictor=predictor)
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                rag.setup_vectorstore(list(entries))
+            fit_time = time.perf_counter() - start
+
+            p50, p95 = single_query_latency(rag, queries, args.k)
+            results = evaluate(rag, valid_df, args.k)
+            print(f"{predictor:<10} {rag.vectors.shape[0]:>8} {fit_time:>7.1f}s {p50:>8.2f} {p95:>8.2f} "
+                  f"{results['qps']:>10.0f} {results['micro']['f1']:>9.3f} {results['macro']['f1']:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
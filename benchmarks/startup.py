@@ -0,0 +1,94 @@
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Heavy dependencies that neither path may import: fitting, CSV loading and the browser
+FORBIDDEN_MODULES = ["sklearn", "pandas", "selenium"]
+# Seconds allowed per scenario, enforced by tests/test_startup.py
+BUDGET_SECONDS = 1.0
+
+SCENARIOS = [
+    ("help", ["main.py", "--help"]),
+    ("predict", ["main.py", "predict", "mesin nya halus dan irit"]),
+]
+
+
+def parse_importtime(stderr):
+    """Return ``(module, depth, cumulative_us)`` for every line of ``-X importtime`` output."""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line.split("|")
+        # Nested imports are indented two spaces per level under their parent
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        modules.append((name.strip(), depth, int(cumulative_us)))
+    return modules
+
+
+def warm_index():
+    # Warm the index cache so the prediction path measures a normal start, not a rebuild
+    subprocess.run([sys.executable, "main.py", "index"], cwd=ROOT, capture_output=True)
+
+
+def forbidden_imports(imported):
+    names = {module for module, _, _ in imported}
+    return [module for module in FORBIDDEN_MODULES
+            if any(name == module or name.startswith(module + ".") for name in names)]
+
+
+def measure(args, runs):
+    best = None
+    imported = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", *args],
+            cwd=ROOT, capture_output=True, text=True
+        )
+        elapsed = time.perf_counter() - start
+        if result.returncode != 0:
+            raise RuntimeError(f"{' '.join(args)} failed:\n{result.stderr[-2000:]}")
+        best = elapsed if best is None else min(best, elapsed)
+        imported = parse_importtime(result.stderr)
+    return best, imported
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check CLI cold start against a time budget")
+    parser.add_argument("--budget", type=float, default=BUDGET_SECONDS, help="seconds allowed per scenario")
+    parser.add_argument("--runs", type=int, default=3, help="best of this many runs is reported")
+    parser.add_argument("--top", type=int, default=8, help="slowest top-level imports to list")
+    args = parser.parse_args()
+
+    warm_index()
+
+    failures = []
+    for name, command in SCENARIOS:
+        elapsed, imported = measure(command, args.runs)
+        status = "✅" if elapsed <= args.budget else "❌"
+        print(f"{status} {name:<10} {elapsed:6.3f}s (budget {args.budget:.2f}s)")
+        if elapsed > args.budget:
+            failures.append(f"{name} took {elapsed:.3f}s")
+
+        top_level = sorted((item for item in imported if item[1] == 0), key=lambda item: -item[2])
+        for module, _, cumulative_us in top_level[:args.top]:
+            print(f"   {module:<32} {cumulative_us / 1000:8.1f}ms")
+
+        loaded = forbidden_imports(imported)
+        if loaded:
+            print(f"   ❌ loaded {', '.join(loaded)}")
+            failures.append(f"{name} imported {', '.join(loaded)}")
+
+    if failures:
+        print("\n❌ Startup budget exceeded: " + "; ".join(failures))
+        sys.exit(1)
+    print("\n✅ Startup within budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+import argparse
+import contextlib
+import io
+
+from index_store import load_or_build_index
+from mock_prodigy import start_mock_server
+from rag_handler import RAGHandler
+from worker_pool import run_worker_pool
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput of the worker pool against a local mock Prodigy")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--latency", type=float, default=0.05, help="mock response latency in seconds")
+    parser.add_argument("--repeat", type=int, default=4, help="copies of valid_preprocess.csv in the feed")
+    parser.add_argument("--batch-size", type=int, default=5)
+    args = parser.parse_args()
+
+    rag = RAGHandler()
+    with contextlib.redirect_stdout(io.StringIO()):
+        load_or_build_index(rag)
+
+    print(f"{'workers':>8} {'tasks':>7} {'elapsed':>9} {'tasks/s':>9} {'scaling':>8}")
+    baseline = None
+
+    for workers in args.workers:
+        server = start_mock_server(latency=args.latency, repeat=args.repeat, batch_size=args.batch_size)
+        host, port = server.server_address[:2]
+        urls = [f"http://{host}:{port}/?session=bench"] * workers
+
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                totals = run_worker_pool(rag, urls, backend_name="api", quiet=True, journal_path=None)
+        finally:
+            server.shutdown()
+
+        baseline = baseline or totals['tasks_per_sec'] / workers
+        scaling = totals['tasks_per_sec'] / baseline if baseline else 0.0
+        print(f"{workers:>8} {totals['tasks']:>7} {totals['elapsed']:>8.2f}s "
+              f"{totals['tasks_per_sec']:>9.1f} {scaling:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+import hashlib
+import sys
+from collections.abc import Sequence
+
+import numpy as np
+
+
+def _text_key(text):
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+class TextBuffer(Sequence):
+    """Texts stored as one UTF-8 byte buffer plus an offset per text.
+
+    Costs the encoded bytes and 8 bytes of offset per text, instead of a
+    Python string object and a list slot each.
+    """
+
+    def __init__(self, buffer, offsets):
+        self.buffer = buffer
+        self.offsets = offsets
+        self._sorted_keys = None
+        self._key_order = None
+
+    @classmethod
+    def from_texts(cls, texts):
+        encoded = [text.encode('utf-8') for text in texts]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(item) for item in encoded], out=offsets[1:])
+        return cls(np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        start, end = self.offsets[index], self.offsets[index + 1]
+        return self.buffer[start:end].tobytes().decode('utf-8')
+
+    def __iter__(self):
+        raw = self.buffer.tobytes()
+        offsets = self.offsets.tolist()
+        for start, end in zip(offsets, offsets[1:]):
+            yield raw[start:end].decode('utf-8')
+
+    def find(self, text):
+        """Index of ``text`` or None, via a lazily built sorted array of 64-bit hashes."""
+        if self._sorted_keys is None:
+            keys = np.fromiter((_text_key(item) for item in self), dtype=np.uint64, count=len(self))
+            self._key_order = np.argsort(keys, kind='stable')
+            self._sorted_keys = keys[self._key_order]
+
+        key = np.uint64(_text_key(text))
+        pos = np.searchsorted(self._sorted_keys, key)
+        while pos < len(self._sorted_keys) and self._sorted_keys[pos] == key:
+            index = int(self._key_order[pos])
+            if self[index] == text:
+                return index
+            pos += 1
+        return None
+
+    @property
+    def nbytes(self):
+        extra = 0 if self._sorted_keys is None else self._sorted_keys.nbytes + self._key_order.nbytes
+        return self.buffer.nbytes + self.offsets.nbytes + extra
+
+
+class LabelCodes:
+    """Per-document label sets packed into one unsigned integer bitmask each.
+
+    Bit ``j`` stands for column ``j`` of the label table. Indexing returns the
+    same boolean rows as the dense matrix it replaces, so callers need no changes.
+    """
+
+    def __init__(self, matrix):
+        matrix = np.asarray(matrix, dtype=bool)
+        n_labels = matrix.shape[1]
+        for dtype in (np.uint8, np.uint16, np.uint32, np.uint64):
+            if np.iinfo(dtype).bits >= n_labels:
+                break
+        else:
+            raise ValueError(f"Cannot pack {n_labels} labels into a 64-bit code")
+
+        self.n_labels = n_labels
+        self.bits = np.left_shift(np.ones(n_labels, dtype=dtype), np.arange(n_labels, dtype=dtype))
+        self.codes = self._pack(matrix)
+
+    def _pack(self, rows):
+        return np.bitwise_or.reduce(np.where(rows, self.bits, 0).astype(self.bits.dtype), axis=-1)
+
+    @property
+    def shape(self):
+        return len(self.codes), self.n_labels
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, index):
+        return (self.codes[index][..., None] & self.bits) != 0
+
+    def __setitem__(self, index, rows):
+        self.codes[index] = self._pack(np.asarray(rows, dtype=bool))
+
+    def __array__(self, dtype=None, copy=None):
+        matrix = self[:]
+        return matrix if dtype is None else matrix.astype(dtype)
+
+
+class KnowledgeEntries(Sequence):
+    """The ``{'text', 'aspect', 'sentiment', 'prodigy_label'}`` entries of an index, built on access.
+
+    Replaces a stored list of dicts. Entries come in document order, then
+    label-table order, and include documents added since the last fit.
+    """
+
+    def __init__(self, rag):
+        self.rag = rag
+
+    def _documents(self):
+        rag = self.rag
+        yield rag.texts, rag.label_matrix
+        if rag.delta is not None and len(rag.delta):
+            yield rag.delta.texts, rag.delta.label_matrix()
+
+    def __len__(self):
+        return sum(int(np.count_nonzero(np.asarray(labels))) for _, labels in self._documents())
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+
+        for texts, labels in self._documents():
+            counts = np.count_nonzero(np.asarray(labels), axis=1)
+            ends = np.cumsum(counts)
+            if ends.size and index < ends[-1]:
+                doc = int(np.searchsorted(ends, index, side='right'))
+                label_idx = np.flatnonzero(labels[doc])[index - (ends[doc] - counts[doc])]
+                label = str(self.rag.label_names[label_idx])
+                aspect, sentiment = label.rsplit('_', 1)
+                return {'text': texts[doc], 'aspect': aspect, 'sentiment': sentiment, 'prodigy_label': label}
+            index -= int(ends[-1]) if ends.size else 0
+        raise IndexError("knowledge entry index out of range")
+
+
+def object_nbytes(value):
+    """Approximate memory held by ``value``: numpy buffers, or Python containers and their items."""
+    if hasattr(value, 'nbytes'):
+        return int(value.nbytes)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(object_nbytes(k) + object_nbytes(v) for k, v in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sys.getsizeof(value) + sum(object_nbytes(item) for item in value)
+    return sys.getsizeof(value)
@@ -1,8 +1,23 @@
 PRODIGY_URL = "https://anotasi.uajy.ac.id/nlp2/?session=220711789"
+
+# "selenium" drives the Prodigy web UI, "api" talks to its REST endpoints directly
+ANNOTATION_BACKEND = "selenium"
+API_BATCH_SIZE = 10
+API_TIMEOUT = 30
+
+# Extra Prodigy session IDs to annotate in parallel, one worker each.
+# When empty, PARALLEL_WORKERS workers share the feed of PRODIGY_URL.
+PRODIGY_SESSIONS = []
+PARALLEL_WORKERS = 1
+
 DATASET_PATHS = [
     "test_preprocess.csv",
     "train_preprocess.csv"
 ]
+# Rows read per chunk when loading the datasets above (.csv, .parquet or .feather)
+DATASET_CHUNK_SIZE = 50_000
+# Fitted TF-IDF index cache, rebuilt whenever the datasets above change
+INDEX_DIR = ".index"
 
 LABEL_MAPPING = {
     'fuel_positive': 'fuel_positive',
@@ -19,6 +34,97 @@ LABEL_MAPPING = {
     'service_negative': 'service_negative'
 }
 
+# Upper bound on tasks per run, counting tasks resumed from the journal
+MAX_TASKS = 1080
 DELAY_BETWEEN_TASKS = 1
+# TF-IDF features of the knowledge index; changing them rebuilds the cached index
+TFIDF_MAX_FEATURES = 1000
+TFIDF_NGRAM_RANGE = (1, 2)
+# "tfidf" keeps a fitted vocabulary; "hashing" hashes n-grams into HASHING_FEATURES
+# columns and stores no vocabulary at all
+VECTORIZER = "tfidf"
+HASHING_FEATURES = 2 ** 18
+# Keep the index as float32/int32 vectors, one byte buffer of texts and bitmask label
+# codes, with knowledge entries rebuilt on access (about 4x less memory per entry)
+COMPACT_MEMORY = False
+# "knn" votes with the most similar knowledge entries; "linear" scores every label with a
+# one-vs-rest logistic regression whose cost per query does not grow with the index, keeping
+# each label above its own threshold calibrated on out-of-fold F1 instead of SIMILARITY_THRESHOLD
+PREDICTOR = "knn"
+LINEAR_C = 1.0
+LINEAR_CV_FOLDS = 5
 SIMILARITY_THRESHOLD = 0.15
-AUTO_SAVE_INTERVAL = 1
+# Minimum share of the neighbours' similarity-weighted vote a label needs (0 keeps every label)
+MIN_LABEL_VOTE = 0.0
+# Save after this many finished tasks, after this many seconds, or once Prodigy's
+# unsaved-answers badge reaches the threshold, whichever comes first (0 disables a trigger)
+AUTO_SAVE_INTERVAL = 10
+AUTO_SAVE_SECONDS = 60
+AUTO_SAVE_BADGE_THRESHOLD = 0
+
+# Wait for the DOM state an action needs instead of fixed sleeps (False restores the old sleeps)
+ADAPTIVE_WAITS = True
+WAIT_POLL_INTERVAL = 0.05
+# Check all predicted labels and accept with one script call per task. Accept waits for the
+# next frame (at most BATCHED_SETTLE_SECONDS) and a read-back of every label. Off until it
+# has been tried against a live Prodigy page
+BATCHED_ACTIONS = False
+BATCHED_SETTLE_SECONDS = 0.1
+# Winning CSS/XPath selector per browser action, remembered between runs
+SELECTOR_CACHE_PATH = ".selector_cache.json"
+# Replace the browser after DRIVER_RECYCLE_TASKS tasks, once the page's JS heap (the V8
+# heap as CDP reports it, not the renderer's RSS) passes DRIVER_MAX_JS_HEAP_MB, or when
+# the median health-probe latency over the last DRIVER_LATENCY_WINDOW probes passes
+# DRIVER_MAX_COMMAND_SECONDS (0 disables a trigger).
+# The probe runs every DRIVER_CHECK_EVERY tasks and after every failed one; a browser
+# that does not answer it within DRIVER_HEALTH_TIMEOUT seconds is replaced at once.
+# Each recycle abandons the tasks the old page had fetched but not answered, until Prodigy
+# re-queues them; benchmarks/end_to_end.py reports how many.
+DRIVER_RECYCLE_TASKS = 200
+DRIVER_MAX_JS_HEAP_MB = 512
+DRIVER_MAX_COMMAND_SECONDS = 2.0
+DRIVER_LATENCY_WINDOW = 5
+DRIVER_CHECK_EVERY = 10
+DRIVER_HEALTH_TIMEOUT = 10
+# Keep a second browser started in the background so a swap does not wait for Chrome to start.
+# It stays on a blank page until swapped in, so it never pulls tasks from the session.
+DRIVER_WARM_STANDBY = True
+PREDICT_BATCH_SIZE = 1024
+
+# Neighbour search: "exact" brute-force cosine, "inverted" postings-based exact top-k
+# that skips documents sharing no term with the query, or "lsh" approximate search
+SEARCH_BACKEND = "exact"
+# LSH recall/speed trade-off: more tables or probes raise recall, more bits make queries faster.
+# Neighbours just above SIMILARITY_THRESHOLD are far apart in angle, so reaching them takes
+# short keys: these settings give recall@3 of 0.96 on the knowledge base (benchmarks/ann.py
+# --real) but rank about 60% of it per query, which is slower than exact search. LSH only
+# pays off with a much higher threshold; keep SEARCH_BACKEND on "exact" or "inverted" otherwise
+LSH_TABLES = 24
+LSH_BITS = 8
+LSH_PROBES = 1
+
+# LRU cache of predictions keyed by normalised task text (0 disables it);
+# set a path to keep a shelve-backed copy on disk between runs
+PREDICTION_CACHE_SIZE = 4096
+PREDICTION_CACHE_PATH = None
+# Accepted annotations are added to the knowledge base during a run; every
+# KB_COMPACT_EVERY new documents a background refit updates vocabulary and IDF
+INCREMENTAL_UPDATES = True
+KB_COMPACT_EVERY = 200
+
+# Upcoming tasks predicted ahead on a worker thread (0 disables the prefetch pipeline)
+PIPELINE_LOOKAHEAD = 4
+PREANNOTATE_CHUNK_SIZE = 1000
+
+# Write-ahead log of task outcomes; a restarted run on the same session resumes from it
+# (None disables). A run that ends with no tasks left or at MAX_TASKS moves it to
+# <path>.done, and a journal of another session is moved to <path>.stale. Worker-pool
+# journals are <path>.<session>. Flushed in the background every N records or T seconds.
+RUN_JOURNAL_PATH = ".run_journal.jsonl"
+JOURNAL_FLUSH_EVERY = 20
+JOURNAL_FLUSH_SECONDS = 5
+
+# Time every backend and RAG method call and write p50/p95/p99 per stage at the
+# end of a run (.csv or .json by extension); when off only the task stages are timed
+PROFILING = False
+PROFILE_EXPORT_PATH = "run_profile.json"
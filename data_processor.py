@@ -1,33 +1,102 @@
+import numpy as np
 import pandas as pd
-from config import DATASET_PATHS
-
-def load_all_datasets():
-    all_data = []
-    
-    for path in DATASET_PATHS:
-        df = pd.read_csv(path)
-        all_data.append(df)
-    
-    combined_df = pd.concat(all_data, ignore_index=True)
-    return combined_df
+from config import DATASET_PATHS, DATASET_CHUNK_SIZE
+
+LABEL_COLUMNS = ['fuel', 'machine', 'others', 'part', 'price', 'service']
+DATASET_COLUMNS = ['sentence'] + LABEL_COLUMNS
+# Aspect columns hold one of three values, so each is stored as int8 category codes
+SENTIMENT_DTYPE = pd.CategoricalDtype(['neutral', 'positive', 'negative'])
+
+def _sentiments(values, column, source="dataset"):
+    """``values`` as SENTIMENT_DTYPE; any other non-null value is an error, not a silent drop."""
+    # Unordered categoricals compare equal whatever their category order, but the codes depend on it
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        if values.dtype.categories.equals(SENTIMENT_DTYPE.categories):
+            return values
+        values = values.astype(object)
+    typed = values.astype(SENTIMENT_DTYPE)
+    unexpected = values[typed.isna() & values.notna()]
+    if len(unexpected):
+        found = sorted(map(str, unexpected.unique()))[:5]
+        raise ValueError(
+            f"{source}: column '{column}' has values outside {list(SENTIMENT_DTYPE.categories)}: {found}"
+        )
+    return typed
+
+def _typed(df, source="dataset"):
+    for column in LABEL_COLUMNS:
+        df[column] = _sentiments(df[column], column, source)
+    return df
+
+def _iter_arrow_batches(path, chunk_size):
+    # pyarrow is only needed for Parquet and Feather inputs
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if path.endswith('.parquet'):
+        yield from pq.ParquetFile(path).iter_batches(batch_size=chunk_size, columns=DATASET_COLUMNS)
+        return
+
+    # Feather v2 is the Arrow IPC file format; memory-mapped batches are sliced without copying
+    with pa.memory_map(path, 'r') as source:
+        reader = pa.ipc.open_file(source)
+        for i in range(reader.num_record_batches):
+            batch = reader.get_batch(i)
+            batch = batch.select([batch.schema.get_field_index(column) for column in DATASET_COLUMNS])
+            for offset in range(0, batch.num_rows, chunk_size):
+                yield batch.slice(offset, chunk_size)
+
+def iter_dataset_chunks(dataset_paths=DATASET_PATHS, chunk_size=DATASET_CHUNK_SIZE):
+    """Yield the labelled datasets as typed DataFrames of at most ``chunk_size`` rows.
+
+    CSV, Parquet and Feather (``.feather``/``.arrow``) files are read a chunk
+    at a time, so memory held by the loader does not grow with the corpus.
+    """
+    for path in dataset_paths:
+        if path.endswith(('.parquet', '.feather', '.arrow')):
+            for batch in _iter_arrow_batches(path, chunk_size):
+                yield _typed(batch.to_pandas(), path)
+        else:
+            # Read as open categories first, so unexpected values can be reported before casting
+            dtype = {column: 'category' for column in LABEL_COLUMNS}
+            for chunk in pd.read_csv(path, usecols=DATASET_COLUMNS, dtype=dtype, chunksize=chunk_size):
+                yield _typed(chunk, path)
+
+def load_all_datasets(dataset_paths=DATASET_PATHS):
+    return pd.concat(iter_dataset_chunks(dataset_paths), ignore_index=True)
+
+def extract_label_frame(df):
+    # Melt the aspect columns into (row, aspect) pairs in row-major order,
+    # which keeps the ordering of the old row-by-row loop
+    codes = np.column_stack([
+        _sentiments(df[column], column).cat.codes.to_numpy() for column in LABEL_COLUMNS
+    ]) if len(df) else np.zeros((0, len(LABEL_COLUMNS)), dtype=np.int8)
+    # Code 0 is neutral and -1 a missing value; neither is a label
+    row_idx, col_idx = np.nonzero(codes > 0)
+
+    aspects = np.array(LABEL_COLUMNS, dtype=object)[col_idx]
+    sentiments = np.array(SENTIMENT_DTYPE.categories, dtype=object)[codes[row_idx, col_idx]]
+
+    return pd.DataFrame({
+        'text': df['sentence'].to_numpy()[row_idx],
+        'aspect': pd.Categorical(aspects, categories=LABEL_COLUMNS),
+        'sentiment': pd.Categorical(sentiments),
+        'prodigy_label': pd.Categorical(aspects + '_' + sentiments)
+    })
 
 def extract_non_neutral_labels(df):
-    knowledge_data = []
-    
-    label_columns = ['fuel', 'machine', 'others', 'part', 'price', 'service']
-    
-    for _, row in df.iterrows():
-        sentence = row['sentence']
-        
-        for col in label_columns:
-            label_value = row[col]
-            
-            if label_value != 'neutral':
-                knowledge_data.append({
-                    'text': sentence,
-                    'aspect': col,
-                    'sentiment': label_value,
-                    'prodigy_label': f"{col}_{label_value}"
-                })
-    
-    return knowledge_data
+    knowledge_frame = extract_label_frame(df)
+    return [
+        {'text': text, 'aspect': aspect, 'sentiment': sentiment, 'prodigy_label': label}
+        for text, aspect, sentiment, label in zip(
+            knowledge_frame['text'].tolist(),
+            knowledge_frame['aspect'].tolist(),
+            knowledge_frame['sentiment'].tolist(),
+            knowledge_frame['prodigy_label'].tolist()
+        )
+    ]
+
+def iter_knowledge_entries(dataset_paths=DATASET_PATHS, chunk_size=DATASET_CHUNK_SIZE):
+    """Knowledge entries of every dataset, extracted one chunk at a time."""
+    for chunk in iter_dataset_chunks(dataset_paths, chunk_size):
+        yield from extract_non_neutral_labels(chunk)
@@ -0,0 +1,74 @@
+import numpy as np
+import scipy.sparse as sp
+
+
+class DeltaIndex:
+    """Append-only buffer of documents added since the last full fit.
+
+    Rows live in growable CSR arrays that double their capacity when full, so
+    ``append`` is amortised O(1) and ``matrix()`` is a view, not a copy. The
+    buffer is searched exactly; it stays small because compaction folds it
+    back into the main index.
+    """
+
+    def __init__(self, n_features, n_labels, capacity=64):
+        self.n_features = n_features
+        self.texts = []
+        self.lookup = {}
+        self.indptr = np.zeros(capacity + 1, dtype=np.int64)
+        self.indices = np.zeros(capacity * 16, dtype=np.int32)
+        self.data = np.zeros(capacity * 16)
+        self.labels = np.zeros((capacity, n_labels), dtype=bool)
+
+    def __len__(self):
+        return len(self.texts)
+
+    def _grow(self, array, needed):
+        if needed <= len(array):
+            return array
+        grown = np.zeros((max(needed, 2 * len(array)),) + array.shape[1:], dtype=array.dtype)
+        grown[:len(array)] = array
+        return grown
+
+    def resize_labels(self, n_labels):
+        if n_labels > self.labels.shape[1]:
+            self.labels = np.pad(self.labels, ((0, 0), (0, n_labels - self.labels.shape[1])))
+
+    def append(self, text, vector, label_row):
+        """Add ``text`` with its 1 x n_features ``vector``, or merge labels if already present."""
+        row = self.lookup.get(text)
+        if row is not None:
+            self.labels[row] |= label_row
+            return row
+
+        row = len(self.texts)
+        vector = vector.tocsr()
+        start = self.indptr[row]
+        end = start + vector.nnz
+
+        self.indptr = self._grow(self.indptr, row + 2)
+        self.indices = self._grow(self.indices, end)
+        self.data = self._grow(self.data, end)
+        self.labels = self._grow(self.labels, row + 1)
+
+        self.indices[start:end] = vector.indices
+        self.data[start:end] = vector.data
+        self.indptr[row + 1] = end
+        self.labels[row] = label_row
+        self.texts.append(text)
+        self.lookup[text] = row
+        return row
+
+    def matrix(self):
+        n = len(self.texts)
+        nnz = self.indptr[n]
+        return sp.csr_matrix(
+            (self.data[:nnz], self.indices[:nnz], self.indptr[:n + 1]),
+            shape=(n, self.n_features)
+        )
+
+    def label_matrix(self):
+        return self.labels[:len(self.texts)]
+
+    def similarities(self, query_vectors):
+        return (query_vectors @ self.matrix().T).toarray()
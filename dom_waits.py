@@ -0,0 +1,156 @@
+import time
+from collections import defaultdict
+
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+
+from config import WAIT_POLL_INTERVAL
+
+TASK_TEXT_SCRIPT = """
+const selectors = arguments[0];
+for (const selector of selectors) {
+    const element = document.querySelector(selector);
+    if (element && element.innerText && element.innerText.trim()) {
+        return [selector, element.innerText.trim()];
+    }
+}
+return null;
+"""
+
+LABEL_CHECKED_SCRIPT = """
+const label = document.querySelector(`label[data-prodigy-label="${arguments[0]}"]`);
+if (!label) return false;
+const input = label.querySelector('input') || (label.htmlFor && document.getElementById(label.htmlFor));
+if (!input) return true;
+return input.checked;
+"""
+
+# Checks every label and clicks accept in a single WebDriver round-trip (execute_async_script).
+# React applies the label clicks on its own schedule, so they are read back only once the
+# next frame has rendered, or after arguments[2] ms where frames are throttled, and accept
+# is clicked only if every clicked label reads back as checked.
+# arguments[0]: label names, arguments[1]: accept button XPaths in priority order.
+BATCH_ACTION_SCRIPT = """
+const [names, xpaths, settleMs, done] = arguments;
+const result = {applied: [], missing: [], unconfirmed: [], submitted: false, selector: null};
+const findLabel = name => document.querySelector(`label[data-prodigy-label="${name}"]`);
+const isChecked = label => {
+    const input = label.querySelector('input') || (label.htmlFor && document.getElementById(label.htmlFor));
+    return !input || input.checked;
+};
+const clicked = [];
+for (const name of names) {
+    const label = findLabel(name);
+    if (!label) {
+        result.missing.push(name);
+        continue;
+    }
+    if (!isChecked(label)) {
+        label.scrollIntoView({block: 'center'});
+        label.click();
+    }
+    clicked.push(name);
+}
+new Promise(resolve => {
+    requestAnimationFrame(() => setTimeout(resolve, 0));
+    setTimeout(resolve, settleMs);
+}).then(() => {
+    for (const name of clicked) {
+        const label = findLabel(name);
+        (label && isChecked(label) ? result.applied : result.unconfirmed).push(name);
+    }
+    if (result.applied.length === 0 || result.unconfirmed.length > 0) return done(result);
+    for (const xpath of xpaths) {
+        const button = document.evaluate(
+            xpath, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null
+        ).singleNodeValue;
+        if (button && !button.disabled && button.offsetParent !== null) {
+            button.click();
+            result.submitted = true;
+            result.selector = xpath;
+            break;
+        }
+    }
+    done(result);
+});
+"""
+
+# Number shown on the sidebar save button's unsaved-answers badge, or null without one
+UNSAVED_COUNT_SCRIPT = """
+const button = document.querySelector('button[data-test="sidebar-button-save"]');
+if (!button) return null;
+const match = (button.innerText || button.getAttribute('aria-label') || '').match(/\\d+/);
+return match ? parseInt(match[0], 10) : null;
+"""
+
+
+class AdaptiveWaiter:
+    """Polls for the DOM state an action is waiting on instead of sleeping a fixed time."""
+
+    def __init__(self, driver, poll_interval=WAIT_POLL_INTERVAL):
+        self.driver = driver
+        self.poll_interval = poll_interval
+        self.durations = defaultdict(list)
+
+    def record(self, name, seconds):
+        self.durations[name].append(seconds)
+
+    def until(self, name, condition, timeout):
+        start = time.perf_counter()
+        try:
+            return WebDriverWait(
+                self.driver,
+                timeout,
+                poll_frequency=self.poll_interval,
+                ignored_exceptions=(WebDriverException,)
+            ).until(condition)
+        except TimeoutException:
+            return None
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def first_clickable(self, name, xpaths, timeout):
+        # Probe every selector on each poll, so a miss costs one poll rather than a full timeout.
+        # Returns the (selector, element) pair that matched.
+        def condition(driver):
+            for xpath in xpaths:
+                for element in driver.find_elements(By.XPATH, xpath):
+                    if element.is_displayed() and element.is_enabled():
+                        return xpath, element
+            return False
+
+        return self.until(name, condition, timeout)
+
+    def task_text(self, name, selectors, timeout):
+        # Returns the (selector, text) pair of the first selector holding text
+        return self.until(
+            name,
+            lambda driver: driver.execute_script(TASK_TEXT_SCRIPT, selectors),
+            timeout
+        )
+
+    def report(self):
+        if not self.durations:
+            return
+
+        print(f"\n⏱️ Browser waits:")
+        for name, values in self.durations.items():
+            mean_ms = sum(values) / len(values) * 1000
+            max_ms = max(values) * 1000
+            print(f"   {name:<16} n={len(values):<5} mean={mean_ms:8.1f}ms  max={max_ms:8.1f}ms")
+
+
+def task_text_changed(selectors, previous_text):
+    def condition(driver):
+        match = driver.execute_script(TASK_TEXT_SCRIPT, selectors)
+        return (match[1] if match else None) != previous_text
+    return condition
+
+
+def label_checked(label_name):
+    return lambda driver: driver.execute_script(LABEL_CHECKED_SCRIPT, label_name)
+
+
+def element_disabled(element):
+    return lambda driver: not element.is_enabled()
@@ -0,0 +1,265 @@
+import atexit
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+from collections import Counter, deque
+
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+
+from config import (
+    DRIVER_RECYCLE_TASKS, DRIVER_MAX_JS_HEAP_MB, DRIVER_MAX_COMMAND_SECONDS, DRIVER_LATENCY_WINDOW,
+    DRIVER_CHECK_EVERY, DRIVER_HEALTH_TIMEOUT, DRIVER_WARM_STANDBY
+)
+
+PROFILE_PREFIX = "prodigy-chrome-"
+
+
+def call_with_timeout(func, timeout):
+    """Run ``func`` on a helper thread and raise TimeoutError if it has not returned in time.
+
+    A hung browser blocks every WebDriver command, so this is the only way to
+    notice one without waiting out Selenium's own, much longer, HTTP timeout.
+    """
+    result = {}
+
+    def target():
+        try:
+            result['value'] = func()
+        except Exception as e:
+            result['error'] = e
+
+    thread = threading.Thread(target=target, name="driver-call", daemon=True)
+    thread.start()
+    thread.join(timeout)
+    if thread.is_alive():
+        raise TimeoutError(f"no answer from the browser within {timeout}s")
+    if 'error' in result:
+        raise result['error']
+    return result.get('value')
+
+
+class BrowserSession:
+    """One Chrome instance, its temporary profile directory and its health samples."""
+
+    def __init__(self, driver, profile_dir, latency_window=DRIVER_LATENCY_WINDOW):
+        self.driver = driver
+        self.profile_dir = profile_dir
+        self.tasks = 0
+        self.latencies = deque(maxlen=latency_window)
+        self.js_heap_mb = None
+        self.started = time.perf_counter()
+
+    def probe(self, timeout=DRIVER_HEALTH_TIMEOUT):
+        """Sample the page's JS heap through CDP, timing the round trip as command latency.
+
+        This is the V8 heap only, not the renderer process's whole memory.
+        """
+        start = time.perf_counter()
+        metrics = call_with_timeout(lambda: self.driver.execute_cdp_cmd('Performance.getMetrics', {}), timeout)
+        self.latencies.append(time.perf_counter() - start)
+
+        values = {metric['name']: metric['value'] for metric in metrics.get('metrics', [])}
+        if 'JSHeapTotalSize' in values:
+            self.js_heap_mb = values['JSHeapTotalSize'] / 2**20
+        return self.latencies[-1], self.js_heap_mb
+
+    def open(self, url):
+        self.driver.get(url)
+
+    def median_latency(self):
+        return statistics.median(self.latencies) if self.latencies else 0.0
+
+    def quit(self, timeout=DRIVER_HEALTH_TIMEOUT):
+        try:
+            call_with_timeout(self.driver.quit, timeout)
+        except Exception as e:
+            print(f"   ⚠️ Browser did not quit cleanly ({e}), killing chromedriver")
+            try:
+                self.driver.service.process.kill()
+            except Exception:
+                pass
+        shutil.rmtree(self.profile_dir, ignore_errors=True)
+
+
+def launch_chrome(implicit_wait=0, latency_window=DRIVER_LATENCY_WINDOW):
+    """Start headless Chrome on a fresh temporary profile, still on its blank start page."""
+    profile_dir = tempfile.mkdtemp(prefix=PROFILE_PREFIX)
+
+    chrome_options = Options()
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument(f"--user-data-dir={profile_dir}")
+    chrome_options.add_argument("--disable-web-security")
+    chrome_options.add_argument("--disable-features=VizDisplayCompositor")
+    chrome_options.add_argument("--headless")
+    chrome_options.add_argument("--disable-extensions")
+    chrome_options.add_argument("--no-first-run")
+    chrome_options.add_argument("--disable-default-apps")
+    chrome_options.add_argument("--remote-debugging-port=0")
+
+    driver = None
+    try:
+        driver = webdriver.Chrome(options=chrome_options)
+        driver.implicitly_wait(implicit_wait)
+        driver.set_page_load_timeout(30)
+        # Performance.getMetrics only reports once the domain is enabled
+        driver.execute_cdp_cmd('Performance.enable', {})
+    except Exception:
+        if driver:
+            driver.quit()
+        shutil.rmtree(profile_dir, ignore_errors=True)
+        raise
+    return BrowserSession(driver, profile_dir, latency_window)
+
+
+class DriverLifecycle:
+    """Owns the browser of one annotation backend and replaces it before it degrades.
+
+    The active browser is recycled after ``recycle_tasks`` tasks, when its JS
+    heap passes ``max_js_heap_mb``, when its median probe latency passes
+    ``max_command_seconds``, or as soon as it stops answering. With
+    ``warm_standby`` a replacement is launched in the background ahead of
+    time, so a swap does not wait for Chrome to start. Every browser's
+    temporary profile directory is removed when it quits.
+
+    ``launch`` returns a browser that has not opened ``url`` yet. Each one
+    opens it only when it becomes active: a loaded Prodigy page pulls a
+    batch of tasks, which a waiting standby would hold back from the run.
+    The page keeps prefetching, so it is never between batches, and a
+    retired browser still takes its unanswered tasks with it. Prodigy
+    serves those again only once it re-queues them.
+    """
+
+    def __init__(self, launch, url, recycle_tasks=DRIVER_RECYCLE_TASKS, max_js_heap_mb=DRIVER_MAX_JS_HEAP_MB,
+                 max_command_seconds=DRIVER_MAX_COMMAND_SECONDS, check_every=DRIVER_CHECK_EVERY,
+                 health_timeout=DRIVER_HEALTH_TIMEOUT, warm_standby=DRIVER_WARM_STANDBY):
+        self.launch = launch
+        self.url = url
+        self.recycle_tasks = recycle_tasks
+        self.max_js_heap_mb = max_js_heap_mb
+        self.max_command_seconds = max_command_seconds
+        self.check_every = check_every
+        self.health_timeout = health_timeout
+        self.warm_standby = warm_standby
+        self.lock = threading.Lock()
+        self.standby = None
+        self.standby_thread = None
+        self.retiring = []
+        self.closed = False
+        self.recycles = Counter()
+        self.swap_seconds = []
+        self.peak_js_heap_mb = 0.0
+
+        self.active = launch()
+        try:
+            self.active.open(url)
+        except Exception:
+            self.active.quit(health_timeout)
+            raise
+        if warm_standby:
+            self._warm()
+        # Profile directories are removed even when the run ends on an exception
+        atexit.register(self.close)
+
+    def _warm(self):
+        def target():
+            try:
+                session = self.launch()
+            except Exception as e:
+                print(f"   ⚠️ Standby browser failed to start: {e}")
+                return
+            with self.lock:
+                if self.closed:
+                    session.quit(self.health_timeout)
+                else:
+                    self.standby = session
+
+        self.standby_thread = threading.Thread(target=target, name="standby-browser", daemon=True)
+        self.standby_thread.start()
+
+    def check(self, succeeded):
+        """Reason to replace the active browser after a finished task, or None to keep it."""
+        session = self.active
+        session.tasks += 1
+        if self.recycle_tasks and session.tasks >= self.recycle_tasks:
+            return "tasks"
+        # A failed task may be a hung browser, so it is always probed
+        if succeeded and (not self.check_every or session.tasks % self.check_every):
+            return None
+
+        try:
+            _, js_heap_mb = session.probe(self.health_timeout)
+        except Exception as e:
+            print(f"   ⚠️ Browser health check failed: {e}")
+            return "unresponsive"
+
+        if js_heap_mb is not None:
+            self.peak_js_heap_mb = max(self.peak_js_heap_mb, js_heap_mb)
+            if self.max_js_heap_mb and js_heap_mb > self.max_js_heap_mb:
+                return "js_heap"
+        if self.max_command_seconds and session.median_latency() > self.max_command_seconds:
+            return "latency"
+        return None
+
+    def recycle(self, reason):
+        """Swap in the standby browser (or a freshly launched one) and retire the active one."""
+        start = time.perf_counter()
+        if self.standby_thread is not None:
+            # Still starting: waiting for it is never slower than a cold launch
+            self.standby_thread.join()
+        with self.lock:
+            standby, self.standby = self.standby, None
+
+        new = standby or self.launch()
+        try:
+            new.open(self.url)
+        except Exception:
+            # The old browser stays active; the next check may try again
+            new.quit(self.health_timeout)
+            if self.warm_standby:
+                self._warm()
+            raise
+
+        old = self.active
+        self.active = new
+        self.recycles[reason] += 1
+        self.swap_seconds.append(time.perf_counter() - start)
+        print(f"   ♻️ Browser recycled ({reason}) after {old.tasks} tasks, swap took {self.swap_seconds[-1]:.2f}s")
+
+        # A hung browser can take a while to die, so it is retired off the task loop
+        retire = threading.Thread(target=old.quit, args=(self.health_timeout,), name="retire-browser", daemon=True)
+        retire.start()
+        self.retiring.append(retire)
+        if self.warm_standby:
+            self._warm()
+        return new
+
+    def close(self):
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            standby, self.standby = self.standby, None
+
+        self.active.quit(self.health_timeout)
+        if standby:
+            standby.quit(self.health_timeout)
+        # A standby still starting quits itself once it sees the lifecycle closed
+        for thread in [self.standby_thread] + self.retiring:
+            if thread is not None:
+                thread.join(2 * self.health_timeout)
+
+    def report(self):
+        if not self.recycles and not self.peak_js_heap_mb:
+            return
+        reasons = ", ".join(f"{reason}={count}" for reason, count in sorted(self.recycles.items())) or "none"
+        print(f"\n♻️ Browser lifecycle:")
+        print(f"   recycles: {reasons}")
+        if self.swap_seconds:
+            print(f"   swap time: mean={statistics.mean(self.swap_seconds):.2f}s max={max(self.swap_seconds):.2f}s")
+        if self.peak_js_heap_mb:
+            print(f"   peak JS heap: {self.peak_js_heap_mb:.0f} MB")
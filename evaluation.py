@@ -0,0 +1,187 @@
+import argparse
+import contextlib
+import io
+import itertools
+import multiprocessing as mp
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from config import (
+    DATASET_PATHS, SIMILARITY_THRESHOLD, MIN_LABEL_VOTE, TFIDF_MAX_FEATURES, TFIDF_NGRAM_RANGE, PREDICTOR
+)
+from data_processor import LABEL_COLUMNS, load_all_datasets, extract_non_neutral_labels
+from prediction_cache import PredictionCache
+from rag_handler import RAGHandler
+
+VALID_PATH = "valid_preprocess.csv"
+
+
+def gold_matrix(df, label_names):
+    # One column per label, true where the row's aspect has that sentiment
+    gold = np.zeros((len(df), len(label_names)), dtype=bool)
+    for j, label in enumerate(label_names):
+        aspect, sentiment = str(label).rsplit('_', 1)
+        if aspect in LABEL_COLUMNS:
+            gold[:, j] = (df[aspect] == sentiment).to_numpy()
+    return gold
+
+
+def label_scores(gold, predicted, label_names):
+    """Per-label precision/recall/F1 plus their micro and macro averages."""
+    true_positives = (gold & predicted).sum(axis=0)
+    predicted_counts = predicted.sum(axis=0)
+    gold_counts = gold.sum(axis=0)
+
+    def prf(tp, n_predicted, n_gold):
+        precision = tp / n_predicted if n_predicted else 0.0
+        recall = tp / n_gold if n_gold else 0.0
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        return precision, recall, f1
+
+    per_label = {}
+    for j, label in enumerate(label_names):
+        precision, recall, f1 = prf(true_positives[j], predicted_counts[j], gold_counts[j])
+        per_label[str(label)] = {
+            'precision': precision, 'recall': recall, 'f1': f1, 'support': int(gold_counts[j])
+        }
+
+    # Labels absent from the gold data would only drag the macro average to 0
+    supported = [scores for scores in per_label.values() if scores['support']]
+    micro = prf(true_positives.sum(), predicted_counts.sum(), gold_counts.sum())
+    return {
+        'per_label': per_label,
+        'micro': dict(zip(('precision', 'recall', 'f1'), micro)),
+        'macro': {
+            metric: float(np.mean([scores[metric] for scores in supported])) if supported else 0.0
+            for metric in ('precision', 'recall', 'f1')
+        }
+    }
+
+
+def evaluate(rag, valid_df, k=3):
+    texts = valid_df['sentence'].astype(str).tolist()
+    start = time.perf_counter()
+    label_names, scores = rag.predict_batch(texts, k)
+    elapsed = time.perf_counter() - start
+
+    results = label_scores(gold_matrix(valid_df, label_names), scores > 0, label_names)
+    results['qps'] = len(texts) / elapsed if elapsed else 0.0
+    return results
+
+
+def fit_handler(knowledge_data, max_features=TFIDF_MAX_FEATURES, ngram_range=TFIDF_NGRAM_RANGE,
+                search_backend="exact", predictor=PREDICTOR):
+    # Exact search by default: its neighbours do not depend on the threshold the
+    # caller sets after fitting, and it is the fastest backend for batched scoring
+    rag = RAGHandler(search_backend, max_features=max_features, ngram_range=ngram_range, predictor=predictor)
+    # Scoring goes through predict_batch, and sweep fits run in parallel, so none of them opens the shelve
+    rag.prediction_cache = PredictionCache(path=None)
+    with contextlib.redirect_stdout(io.StringIO()):
+        rag.setup_vectorstore(knowledge_data)
+    return rag
+
+
+def _evaluate_fit(args):
+    # Fitting is the expensive part, so each job fits once and scores every threshold and k on it
+    knowledge_data, valid_df, max_features, ngram_range, thresholds, ks, votes, predictor = args
+    rag = fit_handler(knowledge_data, max_features, ngram_range, predictor=predictor)
+
+    rows = []
+    for threshold, k, min_vote in itertools.product(thresholds, ks, votes):
+        rag.similarity_threshold = threshold
+        rag.min_label_vote = min_vote
+        results = evaluate(rag, valid_df, k)
+        rows.append({
+            'max_features': max_features,
+            'ngram_range': f"{ngram_range[0]},{ngram_range[1]}",
+            'threshold': threshold,
+            'k': k,
+            'min_vote': min_vote,
+            'micro_f1': results['micro']['f1'],
+            'macro_f1': results['macro']['f1'],
+            'micro_precision': results['micro']['precision'],
+            'micro_recall': results['micro']['recall'],
+            'qps': results['qps']
+        })
+    return rows
+
+
+def sweep(knowledge_data, valid_df, max_features_grid, ngram_grid, thresholds, ks, votes, workers=None,
+          predictor=PREDICTOR):
+    jobs = [
+        (knowledge_data, valid_df, max_features, ngram_range, thresholds, ks, votes, predictor)
+        for max_features, ngram_range in itertools.product(max_features_grid, ngram_grid)
+    ]
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+
+    if workers == 1:
+        results = [_evaluate_fit(job) for job in jobs]
+    else:
+        method = 'fork' if 'fork' in mp.get_all_start_methods() else 'spawn'
+        with mp.get_context(method).Pool(workers) as pool:
+            results = pool.map(_evaluate_fit, jobs)
+
+    rows = pd.DataFrame([row for rows in results for row in rows])
+    return rows.sort_values(['micro_f1', 'macro_f1'], ascending=False, ignore_index=True)
+
+
+def print_report(results):
+    print(f"\n{'label':<20} {'precision':>9} {'recall':>9} {'f1':>9} {'support':>8}")
+    for label, scores in results['per_label'].items():
+        print(f"{label:<20} {scores['precision']:>9.3f} {scores['recall']:>9.3f} "
+              f"{scores['f1']:>9.3f} {scores['support']:>8}")
+    for average in ('micro', 'macro'):
+        scores = results[average]
+        print(f"{average + ' avg':<20} {scores['precision']:>9.3f} {scores['recall']:>9.3f} {scores['f1']:>9.3f}")
+    print(f"\n⚡ {results['qps']:.0f} queries/sec")
+
+
+def parse_ngram(value):
+    low, high = value.split(',')
+    return int(low), int(high)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score the retriever on valid_preprocess.csv, optionally over a parameter grid")
+    parser.add_argument("--valid", default=VALID_PATH)
+    parser.add_argument("--predictor", choices=["knn", "linear"], default=PREDICTOR)
+    parser.add_argument("-k", type=int, nargs="+", default=[3])
+    parser.add_argument("--threshold", type=float, nargs="+", default=[SIMILARITY_THRESHOLD])
+    parser.add_argument("--min-vote", type=float, nargs="+", default=[MIN_LABEL_VOTE])
+    parser.add_argument("--max-features", type=int, nargs="+", default=[TFIDF_MAX_FEATURES])
+    parser.add_argument("--ngram", type=parse_ngram, nargs="+", default=[TFIDF_NGRAM_RANGE], help="e.g. 1,2")
+    parser.add_argument("--workers", type=int, default=None, help="sweep processes, defaults to the number of CPUs")
+    parser.add_argument("--top", type=int, default=15, help="sweep rows to print")
+    parser.add_argument("--output", help="write the sweep results to this CSV")
+    args = parser.parse_args(argv)
+
+    knowledge_data = extract_non_neutral_labels(load_all_datasets(DATASET_PATHS))
+    valid_df = pd.read_csv(args.valid)
+    print(f"📊 {len(knowledge_data)} knowledge entries, {len(valid_df)} validation sentences")
+
+    grid = [args.max_features, args.ngram, args.threshold, args.k, args.min_vote]
+    if args.predictor == "linear" and any(len(values) > 1 for values in grid[2:]):
+        parser.error("the linear predictor has per-label thresholds and no k or vote to sweep")
+    if all(len(values) == 1 for values in grid):
+        rag = fit_handler(knowledge_data, args.max_features[0], args.ngram[0], predictor=args.predictor)
+        rag.similarity_threshold = args.threshold[0]
+        rag.min_label_vote = args.min_vote[0]
+        print_report(evaluate(rag, valid_df, args.k[0]))
+        return
+
+    n_settings = int(np.prod([len(values) for values in grid]))
+    print(f"🔍 Sweeping {n_settings} settings...")
+    start = time.perf_counter()
+    rows = sweep(knowledge_data, valid_df, *grid, workers=args.workers, predictor=args.predictor)
+    print(f"   Done in {time.perf_counter() - start:.1f}s\n")
+    print(rows.head(args.top).to_string(float_format=lambda value: f"{value:.3f}"))
+    if args.output:
+        rows.to_csv(args.output, index=False)
+        print(f"\n   Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+import hashlib
+import itertools
+import os
+
+import numpy as np
+from scipy import sparse
+
+from config import DATASET_PATHS, INDEX_DIR
+from compact_store import TextBuffer, KnowledgeEntries
+from linear_predictor import LinearPredictor
+from tfidf import FrozenTfidf, HashingTfidf
+
+INDEX_FORMAT_VERSION = 4
+INDEX_FILENAME = "knowledge_index.npz"
+
+
+def dataset_fingerprint(rag, dataset_paths=DATASET_PATHS):
+    digest = hashlib.sha256()
+    digest.update(f"format={INDEX_FORMAT_VERSION}".encode())
+    digest.update(f"vectorizer={rag.vectorizer_kind} predictor={rag.predictor}".encode())
+    digest.update(repr(sorted(rag.vectorizer_params.items())).encode())
+
+    for path in dataset_paths:
+        digest.update(path.encode())
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+
+    return digest.hexdigest()
+
+
+def save_index(rag, fingerprint, index_dir=INDEX_DIR):
+    os.makedirs(index_dir, exist_ok=True)
+    path = os.path.join(index_dir, INDEX_FILENAME)
+    tmp_path = path + ".tmp.npz"
+
+    # A hashing vectorizer has an empty vocabulary, so only its IDF weights are stored
+    vocabulary = rag.vectorizer.vocabulary_
+    terms = np.empty(len(vocabulary), dtype=object)
+    for term, idx in vocabulary.items():
+        terms[idx] = term
+
+    vectors = rag.vectors.tocsr()
+    texts = rag.texts if isinstance(rag.texts, TextBuffer) else TextBuffer.from_texts(rag.texts)
+    linear = {}
+    if rag.linear is not None:
+        linear = {
+            'linear_coef': rag.linear.coef,
+            'linear_intercept': rag.linear.intercept,
+            'linear_thresholds': rag.linear.thresholds
+        }
+
+    np.savez(
+        tmp_path,
+        fingerprint=np.array(fingerprint),
+        terms=terms.astype(str),
+        idf=rag.vectorizer.idf_,
+        data=vectors.data,
+        indices=vectors.indices,
+        indptr=vectors.indptr,
+        shape=np.array(vectors.shape),
+        label_names=rag.label_names.astype(str),
+        label_matrix=np.asarray(rag.label_matrix),
+        text_buffer=texts.buffer,
+        text_offsets=texts.offsets,
+        **linear
+    )
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_index(rag, fingerprint, index_dir=INDEX_DIR):
+    path = os.path.join(index_dir, INDEX_FILENAME)
+    if not os.path.exists(path):
+        return False
+
+    with np.load(path) as stored:
+        if str(stored['fingerprint']) != fingerprint:
+            return False
+
+        params = rag.vectorizer_params
+        if rag.vectorizer_kind == "hashing":
+            rag.vectorizer = HashingTfidf(
+                params['n_features'], params['ngram_range'], params['lowercase'], idf=stored['idf']
+            )
+        else:
+            rag.vectorizer = FrozenTfidf(
+                {term: idx for idx, term in enumerate(stored['terms'].tolist())},
+                stored['idf'],
+                params['ngram_range'],
+                params['lowercase']
+            )
+        rag.vectors = sparse.csr_matrix(
+            (stored['data'], stored['indices'], stored['indptr']),
+            shape=tuple(stored['shape'])
+        )
+        rag.label_names = stored['label_names']
+        rag.label_matrix = stored['label_matrix']
+        texts = TextBuffer(stored['text_buffer'], stored['text_offsets'])
+        rag.texts = texts if rag.compact_memory else list(texts)
+        if rag.predictor == "linear":
+            rag.linear = LinearPredictor(
+                stored['linear_coef'], stored['linear_intercept'], stored['linear_thresholds']
+            )
+
+    rag.finalize_index()
+
+    if rag.compact_memory:
+        rag.knowledge_data = KnowledgeEntries(rag)
+        return True
+
+    rag.knowledge_data = []
+    for doc_idx, label_idx in zip(*np.nonzero(rag.label_matrix)):
+        label = str(rag.label_names[label_idx])
+        aspect, sentiment = label.rsplit('_', 1)
+        rag.knowledge_data.append({
+            'text': rag.texts[doc_idx],
+            'aspect': aspect,
+            'sentiment': sentiment,
+            'prodigy_label': label
+        })
+    return True
+
+
+def load_or_build_index(rag, dataset_paths=DATASET_PATHS, index_dir=INDEX_DIR):
+    fingerprint = dataset_fingerprint(rag, dataset_paths)
+    if load_index(rag, fingerprint, index_dir):
+        print(f"   Loaded cached index ({fingerprint[:12]}) with {rag.vectors.shape[0]} documents")
+        return True
+
+    print("   No up-to-date index found, rebuilding...")
+    # pandas is only needed to rebuild, so a cached start never imports it
+    from data_processor import iter_knowledge_entries
+    # Entries are streamed from the datasets a chunk at a time straight into the index
+    entries = iter_knowledge_entries(dataset_paths)
+    first = next(entries, None)
+    if first is None:
+        return False
+
+    rag.setup_vectorstore(itertools.chain([first], entries))
+    print(f"   Extracted {len(rag.knowledge_data)} knowledge entries from {len(dataset_paths)} datasets")
+    path = save_index(rag, fingerprint, index_dir)
+    print(f"   Index saved to {path}")
+    return True
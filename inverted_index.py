@@ -0,0 +1,107 @@
+import numpy as np
+
+from config import SIMILARITY_THRESHOLD
+
+
+class InvertedIndex:
+    """Term-at-a-time cosine search over the postings of a CSC TF-IDF matrix.
+
+    Only documents sharing a term with the query are scored. Terms are
+    visited in order of their largest possible contribution. Once the
+    contribution still to come cannot lift an unseen document above
+    ``threshold``, the remaining terms only update documents already seen.
+    Query cost therefore follows the overlap with the query, not the corpus size.
+
+    The score buffers are allocated once per fit and reused by every search,
+    so searches must not run concurrently; RAGHandler serialises them under
+    its index lock.
+    """
+
+    def __init__(self, threshold=SIMILARITY_THRESHOLD):
+        self.threshold = threshold
+        self.indptr = None
+        self.doc_ids = None
+        self.weights = None
+        self.max_weights = None
+        self.n_docs = 0
+        self.accumulator = None
+        self.seen = None
+
+    def fit(self, vectors):
+        postings = vectors.tocsc()
+        postings.sort_indices()
+        self.indptr = postings.indptr
+        self.doc_ids = postings.indices
+        self.weights = postings.data
+        self.n_docs = vectors.shape[0]
+        self.max_weights = np.zeros(vectors.shape[1])
+        non_empty = np.diff(self.indptr) > 0
+        self.max_weights[non_empty] = np.maximum.reduceat(self.weights, self.indptr[:-1][non_empty])
+        self.accumulator = np.zeros(self.n_docs)
+        self.seen = np.zeros(self.n_docs, dtype=bool)
+        return self
+
+    def _score(self, terms, query_weights, threshold):
+        accumulator = self.accumulator
+        seen = self.seen
+        bounds = query_weights * self.max_weights[terms]
+        order = np.argsort(-bounds)
+        remaining = bounds.sum()
+        touched = []
+
+        for term_idx in order:
+            term = terms[term_idx]
+            start, end = self.indptr[term], self.indptr[term + 1]
+            ids = self.doc_ids[start:end]
+            contributions = self.weights[start:end] * query_weights[term_idx]
+
+            if remaining > threshold:
+                # An unseen document could still pass the threshold, so admit new candidates
+                new_ids = ids[~seen[ids]]
+                seen[new_ids] = True
+                touched.append(new_ids)
+            else:
+                keep = seen[ids]
+                ids = ids[keep]
+                contributions = contributions[keep]
+
+            accumulator[ids] += contributions
+            remaining -= bounds[term_idx]
+
+        return np.concatenate(touched) if touched else np.zeros(0, dtype=self.doc_ids.dtype)
+
+    def search(self, query_vectors, k, threshold=None):
+        """Return ``(indices, scores)`` of shape ``(n_queries, k)``, best first.
+
+        Documents that cannot score above ``threshold`` (the one given at
+        construction by default) may be left out; rows with fewer than ``k``
+        results are padded with index 0 and score 0.
+        """
+        threshold = self.threshold if threshold is None else threshold
+        query_vectors = query_vectors.tocsr()
+        n_queries = query_vectors.shape[0]
+        top_indices = np.zeros((n_queries, k), dtype=np.intp)
+        top_scores = np.zeros((n_queries, k))
+        accumulator = self.accumulator
+        seen = self.seen
+
+        for q in range(n_queries):
+            start, end = query_vectors.indptr[q], query_vectors.indptr[q + 1]
+            if start == end:
+                continue
+
+            candidates = self._score(query_vectors.indices[start:end], query_vectors.data[start:end], threshold)
+            scores = accumulator[candidates]
+            # Reset only the entries this query touched
+            accumulator[candidates] = 0.0
+            seen[candidates] = False
+
+            n = min(k, len(candidates))
+            if n == 0:
+                continue
+            best = np.argpartition(-scores, n - 1)[:n] if n < len(scores) else np.arange(n)
+            best = best[np.argsort(-scores[best], kind='stable')]
+            top_indices[q, :n] = candidates[best]
+            top_scores[q, :n] = scores[best]
+
+        return top_indices, top_scores
@@ -0,0 +1,86 @@
+import numpy as np
+
+from config import LINEAR_C, LINEAR_CV_FOLDS
+
+
+def best_threshold(scores, gold):
+    """Score cut-off that maximises F1 for one label, or inf if it has no positives."""
+    n_positive = int(gold.sum())
+    if n_positive == 0:
+        return np.inf
+
+    order = np.argsort(-scores, kind='stable')
+    scores = scores[order]
+    true_positives = np.cumsum(gold[order])
+    f1 = 2 * true_positives / (np.arange(1, len(scores) + 1) + n_positive)
+    # Only cut between distinct scores, since a threshold keeps or drops all ties together
+    distinct = np.r_[scores[1:] < scores[:-1], True]
+    return float(scores[np.argmax(np.where(distinct, f1, -1.0))])
+
+
+class LinearPredictor:
+    """One-vs-rest logistic regression over the index's TF-IDF vectors.
+
+    Scoring a query is one sparse-dense product with an ``n_features x n_labels``
+    weight matrix, so its cost does not depend on how many documents the model
+    was trained on. Each label gets its own probability threshold, chosen to
+    maximise that label's F1 on out-of-fold predictions.
+    """
+
+    def __init__(self, coef=None, intercept=None, thresholds=None, C=LINEAR_C, folds=LINEAR_CV_FOLDS):
+        self.coef = coef
+        self.intercept = intercept
+        self.thresholds = thresholds
+        self.C = C
+        self.folds = folds
+
+    def _fit_weights(self, vectors, labels):
+        # scikit-learn is only needed to train, never to predict
+        from sklearn.linear_model import LogisticRegression
+
+        coef = np.zeros((vectors.shape[1], labels.shape[1]), dtype=np.float32)
+        intercept = np.zeros(labels.shape[1], dtype=np.float32)
+        for j in range(labels.shape[1]):
+            column = labels[:, j]
+            # A label every document has, or none has, keeps zero weights; its threshold decides it
+            if 0 < column.sum() < len(column):
+                model = LogisticRegression(C=self.C, solver='liblinear').fit(vectors, column)
+                coef[:, j] = model.coef_[0]
+                intercept[j] = model.intercept_[0]
+        return coef, intercept
+
+    def fit(self, vectors, label_matrix, seed=0):
+        labels = np.asarray(label_matrix, dtype=bool)
+        n_docs = labels.shape[0]
+
+        # Out-of-fold probabilities: every document scored by a model that never saw it
+        fold_of = np.random.default_rng(seed).permutation(n_docs) % max(2, self.folds)
+        held_out = np.zeros(labels.shape)
+        for fold in range(max(2, self.folds)):
+            test = fold_of == fold
+            coef, intercept = self._fit_weights(vectors[~test], labels[~test])
+            held_out[test] = self._probabilities(vectors[test], coef, intercept)
+
+        self.thresholds = np.array([best_threshold(held_out[:, j], labels[:, j]) for j in range(labels.shape[1])])
+        self.coef, self.intercept = self._fit_weights(vectors, labels)
+        return self
+
+    @staticmethod
+    def _probabilities(query_vectors, coef, intercept):
+        logits = np.asarray(query_vectors @ coef) + intercept
+        return 1.0 / (1.0 + np.exp(-logits))
+
+    @property
+    def n_labels(self):
+        return len(self.thresholds)
+
+    def predict_scores(self, query_vectors, n_labels=None):
+        """Each label's probability where it clears that label's threshold, else 0.
+
+        Labels added to the table after training score 0 in the extra columns.
+        """
+        probabilities = self._probabilities(query_vectors, self.coef, self.intercept)
+        scores = np.where(probabilities >= self.thresholds, probabilities, 0.0)
+        if n_labels is not None and n_labels > self.n_labels:
+            scores = np.pad(scores, ((0, 0), (0, n_labels - self.n_labels)))
+        return scores
@@ -1,39 +1,87 @@
+import argparse
+import contextlib
+import importlib
+import json
+import sys
 import time
-from config import PRODIGY_URL, DELAY_BETWEEN_TASKS
-from data_processor import load_all_datasets, extract_non_neutral_labels
+from contextlib import nullcontext
+from config import (
+    PRODIGY_URL, DELAY_BETWEEN_TASKS, ANNOTATION_BACKEND, PIPELINE_LOOKAHEAD, INCREMENTAL_UPDATES,
+    MAX_TASKS, RUN_JOURNAL_PATH, PROFILING, PROFILE_EXPORT_PATH
+)
 from rag_handler import RAGHandler
-from selenium_handler import ProdigyHandler
+from index_store import load_or_build_index
+from pipeline import PredictionPipeline
+from profiler import StageTimer, activate, deactivate
+from run_journal import RunJournal
+from save_scheduler import SaveScheduler
 
-def process_single_task(prodigy, rag):
+def create_backend(backend_name, url):
+    if backend_name == "api":
+        from prodigy_api import ProdigyAPIHandler
+        return ProdigyAPIHandler(url)
+    if backend_name == "selenium":
+        from selenium_handler import ProdigyHandler
+        return ProdigyHandler(url)
+    raise ValueError(f"Unknown annotation backend: {backend_name}")
+
+def process_single_task(prodigy, rag, pipeline=None, timer=None, journal=None):
+    stage = timer.stage if timer else (lambda name: nullcontext())
+    start = time.perf_counter()
+    current_text = None
+    task_hash = None
+    replayed = False
+    labels_to_annotate = []
+    succeeded = False
     try:
-        current_text = prodigy.get_current_text()
+        with stage('fetch'):
+            current_text = prodigy.get_current_text()
         if not current_text:
             print("❌ Tidak bisa ambil text dari task")
             return False
         
         print(f"📝 Text: {current_text[:100]}...")
         
-        labels_to_annotate = rag.find_labels_to_annotate(current_text)
+        task_hash = prodigy.current_task_hash()
+        decision = journal.decision(current_text, task_hash) if journal else None
+        replayed = decision is not None
+        if replayed:
+            # Handled before a crash but never saved to Prodigy, so it was served again
+            print("↩️ Task sudah ada di journal, replay keputusan sebelumnya")
+            labels_to_annotate = decision['labels']
+        else:
+            with stage('predict'):
+                if pipeline:
+                    labels_to_annotate = pipeline.labels_for(current_text)
+                else:
+                    labels_to_annotate = rag.find_labels_to_annotate(current_text)
         
         if not labels_to_annotate:
             print("⏭️ Tidak ada label yang cocok, skip task")
-            return prodigy.click_ignore()
+            with stage('ignore'):
+                succeeded = prodigy.click_ignore()
+            return succeeded
         
         print(f"🎯 Predicted labels: {labels_to_annotate}")
         
-        if prodigy.process_multiple_labels(labels_to_annotate):
-            print(f"✅ Berhasil process {len(labels_to_annotate)} labels")
-            time.sleep(0.5)
-            return prodigy.submit_task()
-        else:
-            print("❌ Gagal process labels")
-            return False
+        with stage('apply'):
+            succeeded = prodigy.apply_labels_and_submit(labels_to_annotate)
+        if succeeded and INCREMENTAL_UPDATES:
+            rag.add_annotation(current_text, labels_to_annotate)
+        return succeeded
         
     except Exception as e:
         print(f"❌ Error in process task: {e}")
         return False
+    
+    finally:
+        if journal:
+            action = ('accept' if labels_to_annotate else 'ignore') if succeeded else 'error'
+            journal.record(current_text, labels_to_annotate, action, time.perf_counter() - start,
+                           task_hash=task_hash, replay=replayed)
 
-def run_full_automation(prodigy, rag):
+def run_full_automation(prodigy, rag, lookahead=PIPELINE_LOOKAHEAD, journal=None, max_tasks=MAX_TASKS,
+                        delay=DELAY_BETWEEN_TASKS):
     task_count = 0
     success_count = 0
     max_consecutive_errors = 5  # Increase threshold
@@ -41,28 +89,61 @@ def run_full_automation(prodigy, rag):
     max_total_errors = 50  # Add max total errors
     total_errors = 0
     
+    if journal:
+        task_count, success_count, total_errors = journal.counts()
+        if task_count:
+            print(f"\n📓 Melanjutkan dari journal: {task_count} task ({success_count} berhasil, {total_errors} error)")
+    resumed_tasks, resumed_successes, resumed_errors = task_count, success_count, total_errors
+    
     print("\n🚀 Memulai full automation...")
-    print("💾 Auto-save akan dilakukan setiap 1 task yang berhasil")
+    scheduler = SaveScheduler(journal=journal)
+    if not prodigy.batches_answers:
+        print(f"💾 Auto-save setiap {scheduler.interval} task atau {scheduler.seconds} detik")
+    run_start = time.perf_counter()
     
-    while task_count < 1080:
+    timer = StageTimer()
+    if PROFILING:
+        activate(timer)
+    pipeline = None
+    # Prefetching needs a backend that can see upcoming tasks
+    if lookahead > 0 and prodigy.supports_peek:
+        print(f"🔮 Prefetch aktif: prediksi {lookahead} task ke depan")
+        pipeline = PredictionPipeline(prodigy, rag, lookahead, timer).start()
+    
+    finished = False
+    while task_count < max_tasks:
         try:
             # Check for "No tasks available" message
             if prodigy.check_no_tasks():
                 print("\n✅ Semua task selesai!")
+                finished = True
                 break
             
             print(f"\n📋 Processing task #{task_count + 1}")
             
-            if process_single_task(prodigy, rag):
+            with timer.stage('task'):
+                task_succeeded = process_single_task(prodigy, rag, pipeline, timer, journal)
+            timer.task_done()
+            if pipeline:
+                pipeline.advance()
+            if journal and prodigy.batches_answers and prodigy.unsaved_count() == 0:
+                # The backend just flushed its batch, so nothing answered so far can be served again
+                journal.mark_saved()
+            
+            if task_succeeded:
                 success_count += 1
                 consecutive_errors = 0  # Reset consecutive errors on success
-                print(f"✅ Task #{task_count + 1} berhasil")
+                print(f"✅ Task #{task_count + 1} berhasil ({timer.tasks_per_minute():.1f} tasks/min)")
                 
-                print(f"💾 Auto-saving progress...")
-                if prodigy.auto_save_progress():
-                    print(f"✅ Progress saved! Total completed: {success_count}")
-                else:
-                    print("❌ Auto-save failed, but continuing...")
+                # Batching backends flush their own answers in bulk
+                if not prodigy.batches_answers:
+                    scheduler.task_done()
+                    if scheduler.due(prodigy):
+                        print(f"💾 Auto-saving progress ({scheduler.unsaved} task)...")
+                        if scheduler.save(prodigy, timer):
+                            print(f"✅ Progress saved! Total completed: {success_count}")
+                        else:
+                            print("❌ Auto-save failed, but continuing...")
                 
             else:
                 consecutive_errors += 1
@@ -70,43 +151,79 @@ def run_full_automation(prodigy, rag):
                 print(f"❌ Task #{task_count + 1} gagal (consecutive: {consecutive_errors}, total: {total_errors})")
                 
                 # Stop only if too many consecutive errors AND total errors is high
-                if consecutive_errors >= max_consecutive_errors and total_errors > 10:
+                if consecutive_errors >= max_consecutive_errors and total_errors - resumed_errors > 10:
                     print(f"❌ Terlalu banyak error berturut-turut ({consecutive_errors}) dan total error tinggi ({total_errors}). Stopping automation.")
                     break
                 
                 # Or stop if total errors is extremely high
-                if total_errors >= max_total_errors:
+                if total_errors - resumed_errors >= max_total_errors:
                     print(f"❌ Total error terlalu tinggi ({total_errors}). Stopping automation.")
                     break
             
+            # Checked once this task's answer is counted as unsaved, so the save below includes it
+            recycle_reason = prodigy.recycle_due(task_succeeded)
+            if recycle_reason:
+                # Answers still buffered in the old browser are saved first, unless it has hung
+                if recycle_reason != "unresponsive" and scheduler.unsaved and not prodigy.batches_answers:
+                    scheduler.save(prodigy, timer)
+                try:
+                    with timer.stage('recycle'):
+                        prodigy.recycle(recycle_reason)
+                    # Failures of the replaced browser say nothing about the new one
+                    consecutive_errors = 0
+                except Exception as e:
+                    # The task itself is already counted and journaled; the old browser stays in use
+                    print(f"   ⚠️ Browser recycle failed ({e}), keeping the current browser")
+            
             task_count += 1
+            if journal:
+                # A task replayed from the journal is not counted twice
+                task_count, success_count, total_errors = journal.counts()
             
             if task_count % 25 == 0:
                 success_rate = (success_count / task_count) * 100
                 error_rate = (total_errors / task_count) * 100
                 print(f"\n📊 Progress Report:")
-                print(f"   Tasks processed: {task_count}/1080")
+                print(f"   Tasks processed: {task_count}/{max_tasks}")
                 print(f"   Successful: {success_count}")
                 print(f"   Success rate: {success_rate:.1f}%")
                 print(f"   Error rate: {error_rate:.1f}%")
+                print(f"   Rate: {timer.tasks_per_minute():.1f} tasks/min")
             
-            time.sleep(DELAY_BETWEEN_TASKS)
+            if not prodigy.batches_answers:
+                time.sleep(delay)
             
         except KeyboardInterrupt:
             print("\n⏹️ Automation dihentikan oleh user")
             print("💾 Final save before exit...")
-            prodigy.auto_save_progress()
+            scheduler.save(prodigy, timer)
             break
         except Exception as e:
             print(f"❌ Unexpected error: {e}")
             consecutive_errors += 1
             total_errors += 1
-            if consecutive_errors >= max_consecutive_errors and total_errors > 10:
+            if journal:
+                journal.record(None, [], 'error', 0.0)
+            if consecutive_errors >= max_consecutive_errors and total_errors - resumed_errors > 10:
                 break
     
-    print(f"\n💾 Final save...")
-    if prodigy.auto_save_progress():
-        print("✅ Final progress saved!")
+    if pipeline:
+        pipeline.close()
+    finished = finished or task_count >= max_tasks
+    
+    # Always flush whatever the schedule has not saved yet
+    if scheduler.unsaved or prodigy.batches_answers:
+        print(f"\n💾 Final save...")
+        if scheduler.save(prodigy, timer):
+            print("✅ Final progress saved!")
+        else:
+            finished = False
+    if journal:
+        # A finished run is closed out so the next one starts fresh; any other stop can resume
+        if finished:
+            journal.finish()
+        else:
+            journal.close()
     
     success_rate = (success_count / task_count) * 100 if task_count > 0 else 0
     error_rate = (total_errors / task_count) * 100 if task_count > 0 else 0
@@ -116,7 +233,24 @@ def run_full_automation(prodigy, rag):
     print(f"   Total errors: {total_errors}")
     print(f"   Success rate: {success_rate:.1f}%")
     print(f"   Error rate: {error_rate:.1f}%")
-    print(f"   Total saves performed: {success_count}")
+    print(f"   Total saves performed: {scheduler.saves}")
+    scheduler.report(time.perf_counter() - run_start)
+    timer.report()
+    if PROFILING:
+        deactivate()
+        if PROFILE_EXPORT_PATH:
+            timer.export(PROFILE_EXPORT_PATH)
+    prodigy.report_timings()
+    rag.prediction_cache.report()
+    rag.report_updates()
+    
+    # Counts for this run only, so throughput is not inflated by resumed work
+    return {
+        'tasks': task_count - resumed_tasks,
+        'successes': success_count - resumed_successes,
+        'errors': total_errors - resumed_errors,
+        'stages': timer.summary()
+    }
 
 
 def test_single_task(prodigy, rag):
@@ -165,6 +299,9 @@ def test_save_function(prodigy):
     else:
         print("❌ Save function not working")
         
+        if getattr(prodigy, 'driver', None) is None:
+            return False
+        
         try:
             from selenium.webdriver.common.keys import Keys
             from selenium.webdriver.common.action_chains import ActionChains
@@ -179,37 +316,35 @@ def test_save_function(prodigy):
             print(f"   ❌ Keyboard save failed: {e}")
             return False
 
-def main():
+def run_interactive():
     print("🚀 Starting Prodigy Multi-Label Automation...")
     print("=" * 50)
+    start_time = time.perf_counter()
     
     try:
-        print("\n📊 Step 1: Loading datasets...")
-        df = load_all_datasets()
-        print(f"   Loaded {len(df)} total rows from datasets")
-        
-        print("\n🔍 Step 2: Extracting non-neutral labels...")
-        knowledge_data = extract_non_neutral_labels(df)
-        print(f"   Extracted {len(knowledge_data)} knowledge entries")
-        
-        if len(knowledge_data) == 0:
+        print("\n📊 Step 1-2: Loading knowledge index...")
+        rag = RAGHandler()
+        if not load_or_build_index(rag):
             print("❌ Tidak ada data non-neutral ditemukan!")
             return
+        knowledge_data = rag.knowledge_data
         
         print(f"\n📋 Sample knowledge entries:")
         for i, item in enumerate(knowledge_data[:3], 1):
             print(f"   {i}. {item['text'][:50]}... -> {item['prodigy_label']}")
         
         print("\n🧠 Step 3: Setting up RAG system...")
-        rag = RAGHandler()
-        rag.setup_vectorstore(knowledge_data)
+        rag.predict_batch([knowledge_data[0]['text']])
+        print(f"   ⏱️ Time to first prediction: {time.perf_counter() - start_time:.2f}s")
         print("   RAG system ready!")
         
         print(f"\n🌐 Step 4: Opening Prodigy...")
         print(f"   URL: {PRODIGY_URL}")
-        prodigy = ProdigyHandler(PRODIGY_URL)
+        print(f"   Backend: {ANNOTATION_BACKEND}")
+        prodigy = create_backend(ANNOTATION_BACKEND, PRODIGY_URL)
         
-        time.sleep(3)
+        if ANNOTATION_BACKEND == "selenium":
+            time.sleep(3)
         print("   Prodigy loaded!")
         
         if not test_save_function(prodigy):
@@ -222,7 +357,17 @@ def main():
             response = input("   (y)es / (n)o: ")
             
             if response.lower() == 'y':
-                run_full_automation(prodigy, rag)
+                # Imported here because worker_pool itself imports this module
+                from worker_pool import worker_urls, run_worker_pool
+                urls = worker_urls()
+                if len(urls) > 1:
+                    # The test browser would sit on its fetched batch for the whole pool run
+                    prodigy.auto_save_progress()
+                    prodigy.close()
+                    run_worker_pool(rag, urls)
+                else:
+                    journal = RunJournal(RUN_JOURNAL_PATH, session=PRODIGY_URL) if RUN_JOURNAL_PATH else None
+                    run_full_automation(prodigy, rag, journal=journal)
             else:
                 print("⏹️ Automation dihentikan oleh user")
         else:
@@ -248,5 +393,55 @@ def main():
         print("\n🏁 Automation selesai!")
         print("=" * 50)
 
+def predict(texts, k=3):
+    # Progress messages go to stderr so stdout stays one JSON object per text
+    with contextlib.redirect_stdout(sys.stderr):
+        rag = RAGHandler()
+        if not load_or_build_index(rag):
+            print("❌ Tidak ada data non-neutral ditemukan!")
+            return
+
+    label_names, scores = rag.predict_batch(texts, k)
+    for text, row in zip(texts, scores):
+        labels = rag.labels_from_scores(label_names, row)
+        print(json.dumps({'text': text, 'labels': labels}, ensure_ascii=False))
+
+
+# Subcommands implemented by their own module's CLI, which parses the rest of argv
+FORWARDED_COMMANDS = {
+    "preannotate": ("preannotate", "pre-annotate a file offline into Prodigy JSONL"),
+    "evaluate": ("evaluation", "score the retriever on the validation set"),
+    "mock": ("mock_prodigy", "serve a local mock Prodigy")
+}
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] in FORWARDED_COMMANDS:
+        module = importlib.import_module(FORWARDED_COMMANDS[argv[0]][0])
+        return module.main(argv[1:])
+
+    parser = argparse.ArgumentParser(description="Prodigy multi-label automation")
+    commands = parser.add_subparsers(dest="command")
+    commands.add_parser("run", help="annotate a live Prodigy session (default)")
+    predict_parser = commands.add_parser("predict", help="print predicted labels without opening Prodigy")
+    predict_parser.add_argument("texts", nargs="*", help="texts to label; read one per line from stdin if omitted")
+    predict_parser.add_argument("-k", type=int, default=3, help="neighbours per prediction")
+    commands.add_parser("index", help="build or refresh the cached knowledge index")
+    for name, (_, help_text) in FORWARDED_COMMANDS.items():
+        commands.add_parser(name, help=help_text)
+    args = parser.parse_args(argv)
+
+    if args.command in (None, "run"):
+        run_interactive()
+    elif args.command == "predict":
+        texts = args.texts or [line.rstrip("\n") for line in sys.stdin if line.strip()]
+        predict(texts, args.k)
+    elif args.command == "index":
+        rag = RAGHandler()
+        if not load_or_build_index(rag):
+            print("❌ Tidak ada data non-neutral ditemukan!")
+            return
+        rag.report_memory()
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,294 @@
+import argparse
+import csv
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from config import LABEL_MAPPING
+
+MOCK_DATASET = "mock_dataset"
+LABEL_COLUMNS = ['fuel', 'machine', 'others', 'part', 'price', 'service']
+
+
+# Minimal single-page annotation UI. It has the same DOM hooks the Selenium
+# handler drives on the real Prodigy app and talks to the REST stub below.
+MOCK_PAGE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>Prodigy (mock)</title>
+<style>
+body { font-family: sans-serif; margin: 0; display: flex; }
+aside { width: 160px; padding: 16px; background: #583fcf; min-height: 100vh; }
+main { flex: 1; padding: 24px; }
+.prodigy-content { font-size: 18px; padding: 16px; border: 1px solid #ddd; margin-bottom: 16px; }
+.prodigy-options label { display: block; padding: 4px 0; cursor: pointer; }
+.prodigy-buttons button { margin-right: 8px; padding: 8px 16px; }
+.prodigy-message { display: none; font-size: 18px; }
+</style>
+</head>
+<body>
+<aside>
+  <button data-test="sidebar-button-save" title="Save (ctrl+s)" disabled>Save <span class="prodigy-badge"></span></button>
+</aside>
+<main>
+  <div class="prodigy-container">
+    <div class="prodigy-content"></div>
+    <div class="prodigy-options"></div>
+  </div>
+  <div class="prodigy-message">No tasks available. Make sure to save your progress!</div>
+  <div class="prodigy-buttons">
+    <button class="prodigy-button-accept" data-key="accept" title="Accept (a)" style="background: green">Accept</button>
+    <button class="prodigy-button-ignore" data-key="ignore" title="Ignore (space)">Ignore</button>
+  </div>
+</main>
+<script>
+const sessionName = new URLSearchParams(window.location.search).get('session');
+const queue = [];
+const pending = [];
+let sessionId = sessionName;
+let current = null;
+let exhausted = false;
+let fetching = null;
+
+async function post(endpoint, payload) {
+  const response = await fetch(endpoint, {method: 'POST', body: JSON.stringify(payload)});
+  return response.json();
+}
+
+function fetchTasks() {
+  if (fetching || exhausted) return fetching;
+  fetching = post('get_session_questions', {session_id: sessionId}).then(data => {
+    if (!data.tasks.length) exhausted = true;
+    queue.push(...data.tasks);
+    fetching = null;
+  });
+  return fetching;
+}
+
+function updateSaveButton() {
+  const button = document.querySelector('button[data-test="sidebar-button-save"]');
+  button.disabled = pending.length === 0;
+  button.querySelector('.prodigy-badge').textContent = pending.length ? pending.length : '';
+}
+
+async function showNext() {
+  current = null;
+  if (!queue.length) await fetchTasks();
+  current = queue.shift() || null;
+  const content = document.querySelector('.prodigy-content');
+  const options = document.querySelector('.prodigy-options');
+  options.innerHTML = '';
+  if (!current) {
+    content.textContent = '';
+    document.querySelector('.prodigy-container').style.display = 'none';
+    document.querySelector('.prodigy-buttons').style.display = 'none';
+    document.querySelector('.prodigy-message').style.display = 'block';
+    return;
+  }
+  content.textContent = current.text;
+  for (const option of current.options) {
+    const label = document.createElement('label');
+    label.setAttribute('data-prodigy-label', option.id);
+    const input = document.createElement('input');
+    input.type = 'checkbox';
+    input.value = option.id;
+    label.appendChild(input);
+    label.appendChild(document.createTextNode(' ' + option.text));
+    options.appendChild(label);
+  }
+  if (queue.length < 2) fetchTasks();
+}
+
+function answer(kind) {
+  if (!current) return;
+  const accept = [...document.querySelectorAll('.prodigy-options input:checked')].map(input => input.value);
+  pending.push(Object.assign({}, current, {accept: kind === 'accept' ? accept : [], answer: kind}));
+  updateSaveButton();
+  showNext();
+}
+
+async function save() {
+  if (!pending.length) return;
+  const answers = pending.splice(0, pending.length);
+  updateSaveButton();
+  await post('give_answers', {answers: answers, session_id: sessionId});
+}
+
+document.querySelector('.prodigy-button-accept').addEventListener('click', () => answer('accept'));
+document.querySelector('.prodigy-button-ignore').addEventListener('click', () => answer('ignore'));
+document.querySelector('button[data-test="sidebar-button-save"]').addEventListener('click', save);
+document.addEventListener('keydown', event => {
+  if ((event.ctrlKey || event.metaKey) && event.key === 's') {
+    event.preventDefault();
+    save();
+  }
+});
+
+fetch('project').then(response => response.json()).then(project => {
+  if (project.dataset && sessionName) sessionId = project.dataset + '-' + sessionName;
+  showNext();
+});
+</script>
+</body>
+</html>
+"""
+
+
+def load_mock_tasks(path, repeat=1):
+    options = [{'id': label.upper(), 'text': label.upper()} for label in LABEL_MAPPING]
+    tasks = []
+
+    with open(path, newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+
+    # Repeating the file gives a longer feed; each copy gets its own task hash
+    for copy in range(repeat):
+        for row in rows:
+            text = row['sentence']
+            task_hash = int(hashlib.md5(f"{copy}:{text}".encode('utf-8')).hexdigest()[:8], 16)
+            tasks.append({
+                'text': text,
+                'options': options,
+                '_input_hash': task_hash,
+                '_task_hash': task_hash,
+                '_view_id': 'choice',
+                'gold': sorted(
+                    f"{col}_{row[col]}".upper() for col in LABEL_COLUMNS
+                    if row[col] != 'neutral'
+                )
+            })
+
+    return tasks
+
+
+class MockProdigyState:
+    def __init__(self, tasks, batch_size=10, latency=0.0):
+        self.tasks = tasks
+        self.batch_size = batch_size
+        self.latency = latency
+        self.position = 0
+        self.answers = []
+        # Number of upcoming give_answers requests to reject, to exercise client retries
+        self.failing_saves = 0
+        self.lock = threading.Lock()
+
+    def next_batch(self):
+        with self.lock:
+            batch = self.tasks[self.position:self.position + self.batch_size]
+            self.position += len(batch)
+        return [{k: v for k, v in task.items() if k != 'gold'} for task in batch]
+
+    def add_answers(self, answers):
+        with self.lock:
+            if self.failing_saves > 0:
+                self.failing_saves -= 1
+                return None
+            self.answers.extend(answers)
+            return len(self.answers)
+
+
+class MockProdigyRequestHandler(BaseHTTPRequestHandler):
+    state = None
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(length) or b'{}')
+
+    def _simulate_latency(self):
+        if self.state.latency:
+            time.sleep(self.state.latency)
+
+    def _send_page(self):
+        body = MOCK_PAGE.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self._simulate_latency()
+        path = urlsplit(self.path).path
+        if path.rstrip('/').endswith('/project'):
+            self._send_json({'dataset': MOCK_DATASET, 'view_id': 'choice'})
+        elif path in ('', '/', '/index.html'):
+            self._send_page()
+        else:
+            self._send_json({'error': 'not found'}, status=404)
+
+    def do_POST(self):
+        state = self.state
+        payload = self._read_json()
+        self._simulate_latency()
+
+        if self.path.rstrip('/').endswith('/get_session_questions'):
+            tasks = state.next_batch()
+            self._send_json({
+                'tasks': tasks,
+                'total': len(state.tasks),
+                'progress': len(state.answers) / max(len(state.tasks), 1),
+                'session_id': payload.get('session_id')
+            })
+        elif self.path.rstrip('/').endswith('/give_answers'):
+            total = state.add_answers(payload.get('answers', []))
+            if total is None:
+                self._send_json({'error': 'saving failed'}, status=503)
+            else:
+                self._send_json({'progress': total / max(len(state.tasks), 1), 'total': total})
+        else:
+            self._send_json({'error': 'not found'}, status=404)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_mock_server(tasks_path="valid_preprocess.csv", host="127.0.0.1", port=0, batch_size=10, latency=0.0,
+                      repeat=1):
+    state = MockProdigyState(load_mock_tasks(tasks_path, repeat), batch_size=batch_size, latency=latency)
+    handler = type('BoundMockProdigyRequestHandler', (MockProdigyRequestHandler,), {'state': state})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.state = state
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local stub of the Prodigy web app and REST API")
+    parser.add_argument("--tasks", default="valid_preprocess.csv")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--batch-size", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--repeat", type=int, default=1, help="serve the task file this many times")
+    args = parser.parse_args(argv)
+
+    server = start_mock_server(args.tasks, args.host, args.port, args.batch_size, args.latency, args.repeat)
+    host, port = server.server_address[:2]
+    print(f"🧪 Mock Prodigy running at http://{host}:{port}/?session=mock")
+    print(f"   Serving {len(server.state.tasks)} tasks from {args.tasks}")
+
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        print("\n⏹️ Mock Prodigy stopped")
+        print(f"   Answers received: {len(server.state.answers)}")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
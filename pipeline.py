@@ -0,0 +1,97 @@
+import threading
+
+from config import PIPELINE_LOOKAHEAD
+from profiler import StageTimer
+
+_MISSING = object()
+
+
+class PredictionPipeline:
+    """Predicts upcoming tasks on a worker thread while the current one is being annotated.
+
+    The worker only looks ``lookahead`` tasks ahead and then blocks until the
+    consumer moves on, so it never runs further ahead than that.
+    """
+
+    def __init__(self, prodigy, rag, lookahead=PIPELINE_LOOKAHEAD, timer=None):
+        self.prodigy = prodigy
+        self.rag = rag
+        self.lookahead = lookahead
+        self.timer = timer or StageTimer()
+        self.results = {}
+        self.in_flight = set()
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.condition = threading.Condition()
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._worker, name="prediction-prefetch", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def _worker(self):
+        while not self.stop_event.is_set():
+            with self.condition:
+                generation = self.generation
+
+            try:
+                upcoming = self.prodigy.peek_texts(self.lookahead)
+            except Exception as e:
+                print(f"   ⚠️ Prefetch failed: {e}")
+                upcoming = []
+
+            with self.condition:
+                pending = [text for text in upcoming if text and text not in self.results]
+                self.in_flight.update(pending)
+
+            if pending:
+                try:
+                    with self.timer.stage('prefetch'):
+                        label_names, scores = self.rag.predict_batch(pending)
+                    predictions = [self.rag.labels_from_scores(label_names, row) for row in scores]
+                except Exception as e:
+                    print(f"   ⚠️ Prefetch prediction failed: {e}")
+                    predictions = []
+                with self.condition:
+                    self.in_flight.difference_update(pending)
+                    for text, labels in zip(pending, predictions):
+                        self.results[text] = labels
+                    # Drop predictions for tasks that are no longer queued
+                    for text in list(self.results):
+                        if text not in upcoming:
+                            del self.results[text]
+                    self.condition.notify_all()
+
+            with self.condition:
+                self.condition.wait_for(
+                    lambda: self.stop_event.is_set() or self.generation != generation,
+                    timeout=0.5
+                )
+
+    def labels_for(self, text):
+        with self.condition:
+            # Wait for a prediction the worker has already started instead of repeating it
+            self.condition.wait_for(lambda: text not in self.in_flight, timeout=5)
+            labels = self.results.pop(text, _MISSING)
+
+        if labels is not _MISSING:
+            self.hits += 1
+            return labels
+
+        self.misses += 1
+        return self.rag.find_labels_to_annotate(text)
+
+    def advance(self):
+        with self.condition:
+            self.generation += 1
+            self.condition.notify_all()
+
+    def close(self):
+        self.stop_event.set()
+        with self.condition:
+            self.condition.notify_all()
+        if self.thread.is_alive():
+            self.thread.join(timeout=5)
+        print(f"   Prefetch hits: {self.hits}, misses: {self.misses}")
@@ -0,0 +1,128 @@
+import argparse
+import json
+import multiprocessing as mp
+import os
+import time
+from collections import deque
+
+import pandas as pd
+
+from config import LABEL_MAPPING, PREANNOTATE_CHUNK_SIZE
+from index_store import load_or_build_index
+from rag_handler import RAGHandler
+
+PRODIGY_OPTIONS = [{'id': label.upper(), 'text': label.upper()} for label in LABEL_MAPPING]
+
+# Fitted RAGHandler of each pool process, inherited from the parent under fork
+_worker_rag = None
+
+
+def iter_input_chunks(path, chunk_size, text_column='sentence'):
+    if path.endswith('.jsonl'):
+        chunk = []
+        with open(path, encoding='utf-8') as f:
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                text = record.get('text') if isinstance(record, dict) else None
+                if not isinstance(text, str) or not text.strip():
+                    print(f"   ⚠️ {path}:{line_number}: no 'text' field, skipped")
+                    continue
+                chunk.append(record)
+                if len(chunk) >= chunk_size:
+                    yield chunk
+                    chunk = []
+        if chunk:
+            yield chunk
+    else:
+        for df in pd.read_csv(path, chunksize=chunk_size, usecols=[text_column]):
+            # Empty cells would otherwise become the text "nan"
+            yield [{'text': text} for text in df[text_column].dropna().astype(str).tolist()]
+
+
+def annotate_chunk(rag, records, k=3):
+    texts = [record['text'] for record in records]
+    label_names, scores = rag.predict_batch(texts, k)
+
+    lines = []
+    for record, row in zip(records, scores):
+        labels = rag.labels_from_scores(label_names, row)
+        task = dict(record)
+        task['options'] = PRODIGY_OPTIONS
+        task['accept'] = [label.upper() for label in labels]
+        task['answer'] = 'accept' if labels else 'ignore'
+        task.setdefault('meta', {})['scores'] = {
+            label.upper(): round(float(row[i]), 4) for i, label in enumerate(label_names) if row[i] > 0
+        }
+        lines.append(json.dumps(task, ensure_ascii=False))
+    return lines
+
+
+def _init_worker(rag):
+    global _worker_rag
+    rag.prediction_cache.detach()
+    _worker_rag = rag
+
+
+def _annotate_in_worker(args):
+    records, k = args
+    return annotate_chunk(_worker_rag, records, k)
+
+
+def preannotate_file(rag, input_path, output_path, chunk_size=PREANNOTATE_CHUNK_SIZE, workers=None, k=3):
+    workers = workers or os.cpu_count() or 1
+    chunks = iter_input_chunks(input_path, chunk_size)
+    written = 0
+    start = time.perf_counter()
+
+    with open(output_path, 'w', encoding='utf-8') as out:
+        def write(lines):
+            nonlocal written
+            for line in lines:
+                out.write(line + '\n')
+            written += len(lines)
+
+        if workers == 1:
+            for records in chunks:
+                write(annotate_chunk(rag, records, k))
+        else:
+            method = 'fork' if 'fork' in mp.get_all_start_methods() else 'spawn'
+            with mp.get_context(method).Pool(workers, initializer=_init_worker, initargs=(rag,)) as pool:
+                # Keep only a couple of chunks per worker in flight so memory stays
+                # constant no matter how large the input is; results are written in order
+                in_flight = deque()
+                for records in chunks:
+                    in_flight.append(pool.apply_async(_annotate_in_worker, ((records, k),)))
+                    if len(in_flight) >= workers * 2:
+                        write(in_flight.popleft().get())
+                while in_flight:
+                    write(in_flight.popleft().get())
+
+    elapsed = time.perf_counter() - start
+    rate = written / elapsed if elapsed else 0.0
+    print(f"   Wrote {written} tasks to {output_path} in {elapsed:.1f}s ({rate:.0f} sentences/sec)")
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pre-annotate sentences offline into Prodigy-ready JSONL")
+    parser.add_argument("input", help="CSV with a sentence column, or JSONL with a text field")
+    parser.add_argument("output", help="JSONL file for `prodigy db-in`")
+    parser.add_argument("--chunk-size", type=int, default=PREANNOTATE_CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=None, help="defaults to the number of CPUs")
+    parser.add_argument("-k", type=int, default=3, help="neighbours per prediction")
+    args = parser.parse_args(argv)
+
+    print("🧠 Loading knowledge index...")
+    rag = RAGHandler()
+    if not load_or_build_index(rag):
+        print("❌ Tidak ada data non-neutral ditemukan!")
+        return
+
+    print(f"🏷️ Pre-annotating {args.input}...")
+    preannotate_file(rag, args.input, args.output, args.chunk_size, args.workers, args.k)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+import shelve
+import threading
+from collections import OrderedDict
+
+from config import PREDICTION_CACHE_SIZE, PREDICTION_CACHE_PATH
+
+_GENERATION_KEY = "__generation__"
+
+
+def normalize_text(text):
+    return " ".join(text.lower().split())
+
+
+class PredictionCache:
+    """Bounded LRU of predictions keyed by normalised text, with an optional shelve tier on disk.
+
+    Entries belong to one index generation. ``invalidate`` with a different
+    generation empties both tiers, so a rebuilt index never serves stale
+    results; the same generation, as after a restart on an unchanged index,
+    keeps them.
+    """
+
+    def __init__(self, maxsize=PREDICTION_CACHE_SIZE, path=PREDICTION_CACHE_PATH):
+        self.maxsize = maxsize
+        self.path = path
+        self.entries = OrderedDict()
+        self.generation = None
+        self.disk = None
+        self.inherited_disk = None
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __getstate__(self):
+        # Spawned pool workers get their own memory tier; the shelve stays with the parent
+        state = self.__dict__.copy()
+        state['lock'] = None
+        state['disk'] = None
+        state['inherited_disk'] = None
+        state['path'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    def detach(self):
+        """Stop using the disk tier in a forked child, keeping only the memory tier.
+
+        A forked child shares the parent's open shelve, and closing it there
+        would write the child's copy of the dbm state into the parent's file.
+        The handle is therefore kept unused until the child exits, which
+        skips finalizers.
+        """
+        self.lock = threading.Lock()
+        self.inherited_disk, self.disk = self.disk, None
+        self.path = None
+
+    def _key(self, text, k):
+        return f"{k}:{normalize_text(text)}"
+
+    def _open_disk(self):
+        if self.path and self.disk is None:
+            self.disk = shelve.open(self.path)
+
+    def invalidate(self, generation):
+        with self.lock:
+            if generation != self.generation:
+                self.entries.clear()
+            self.generation = generation
+            self._open_disk()
+            if self.disk is not None and self.disk.get(_GENERATION_KEY) != generation:
+                self.disk.clear()
+                self.disk[_GENERATION_KEY] = generation
+
+    def get(self, text, k):
+        if self.maxsize <= 0:
+            return None
+
+        key = self._key(text, k)
+        with self.lock:
+            value = self.entries.get(key)
+            if value is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return value
+
+            if self.disk is not None:
+                value = self.disk.get(key)
+                if value is not None:
+                    self.disk_hits += 1
+                    self._store(key, value)
+                    return value
+
+            self.misses += 1
+            return None
+
+    def put(self, text, k, value):
+        if self.maxsize <= 0:
+            return
+
+        key = self._key(text, k)
+        with self.lock:
+            self._store(key, value)
+            if self.disk is not None:
+                self.disk[key] = value
+
+    def _store(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self):
+        return {
+            'size': len(self.entries),
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'evictions': self.evictions
+        }
+
+    def report(self):
+        total = self.hits + self.disk_hits + self.misses
+        if not total:
+            return
+        hit_rate = (self.hits + self.disk_hits) / total * 100
+        print(f"\n🗃️ Prediction cache:")
+        print(f"   hits={self.hits} disk_hits={self.disk_hits} misses={self.misses} "
+              f"evictions={self.evictions} hit rate={hit_rate:.1f}%")
+
+    def close(self):
+        with self.lock:
+            if self.disk is not None:
+                self.disk.close()
+                self.disk = None
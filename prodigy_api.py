@@ -0,0 +1,218 @@
+import threading
+import time
+from collections import deque
+from urllib.parse import urlsplit, urlunsplit, parse_qs
+
+import requests
+
+from annotation_backend import AnnotationBackend
+from config import API_BATCH_SIZE, API_TIMEOUT
+from profiler import timed
+
+
+def split_session_url(url):
+    parts = urlsplit(url)
+    session = parse_qs(parts.query).get('session', [None])[0]
+    path = parts.path if parts.path.endswith('/') else parts.path + '/'
+    base_url = urlunsplit((parts.scheme, parts.netloc, path, '', ''))
+    return base_url, session
+
+
+class ProdigyAPIHandler(AnnotationBackend):
+    batches_answers = True
+    supports_peek = True
+
+    def __init__(self, url, batch_size=API_BATCH_SIZE):
+        self.url = url
+        self.base_url, self.session_name = split_session_url(url)
+        self.batch_size = batch_size
+        self.http = requests.Session()
+        self.session_id = None
+        self.queue = deque()
+        self.current_task = None
+        self.current_labels = []
+        self.pending_answers = []
+        self.seen_hashes = set()
+        self.exhausted = False
+        # Guards the task queue, which the prefetch worker reads concurrently
+        self.lock = threading.RLock()
+        self.setup_session()
+
+    def setup_session(self):
+        try:
+            project = self._request('get', 'project')
+            dataset = project.get('dataset')
+            if dataset and self.session_name:
+                self.session_id = f"{dataset}-{self.session_name}"
+            else:
+                self.session_id = self.session_name
+            print(f"   Prodigy API ready (session: {self.session_id})")
+        except Exception as e:
+            print(f"   Error connecting to Prodigy API: {e}")
+            raise
+
+    def _request(self, method, endpoint, payload=None):
+        response = self.http.request(
+            method,
+            self.base_url + endpoint,
+            json=payload,
+            timeout=API_TIMEOUT
+        )
+        response.raise_for_status()
+        return response.json()
+
+    @timed('api.fetch_tasks')
+    def fetch_tasks(self):
+        if self.exhausted:
+            return 0
+
+        data = self._request('post', 'get_session_questions', {'session_id': self.session_id})
+        added = 0
+        for task in data.get('tasks', []):
+            task_hash = task.get('_task_hash')
+            if task_hash is not None and task_hash in self.seen_hashes:
+                continue
+            if task_hash is not None:
+                self.seen_hashes.add(task_hash)
+            self.queue.append(task)
+            added += 1
+
+        if added == 0:
+            self.exhausted = True
+        return added
+
+    def _ensure_current(self):
+        with self.lock:
+            if self.current_task is None:
+                if not self.queue:
+                    self.fetch_tasks()
+                if self.queue:
+                    self.current_task = self.queue.popleft()
+                    self.current_labels = []
+            return self.current_task
+
+    def peek_texts(self, n):
+        with self.lock:
+            self._ensure_current()
+            if self.current_task is None:
+                return []
+
+            while len(self.queue) < n - 1 and not self.exhausted:
+                if self.fetch_tasks() == 0:
+                    break
+
+            tasks = [self.current_task] + list(self.queue)[:n - 1]
+            return [(task.get('text') or '').strip() for task in tasks]
+
+    @timed('api.get_current_text')
+    def get_current_text(self):
+        try:
+            task = self._ensure_current()
+            if task is None:
+                return None
+            return (task.get('text') or '').strip() or None
+        except Exception as e:
+            print(f"   Error getting text: {e}")
+            return None
+
+    def current_task_hash(self):
+        with self.lock:
+            return self.current_task.get('_task_hash') if self.current_task else None
+
+    def _option_id(self, label_name):
+        options = self.current_task.get('options') or []
+        for option in options:
+            option_id = str(option.get('id', ''))
+            if option_id.lower() == label_name.lower():
+                return option['id']
+        if options:
+            return None
+        return label_name.upper()
+
+    @timed('api.process_multiple_labels')
+    def process_multiple_labels(self, labels_list):
+        if self._ensure_current() is None:
+            return False
+
+        success_count = 0
+        for label_name in labels_list:
+            option_id = self._option_id(label_name)
+            if option_id is None:
+                print(f"   ❌ Label '{label_name}' not in task options")
+                continue
+            if option_id not in self.current_labels:
+                self.current_labels.append(option_id)
+            print(f"   ✅ Selected label: {option_id}")
+            success_count += 1
+
+        return success_count > 0
+
+    def _answer_current(self, answer):
+        with self.lock:
+            if self._ensure_current() is None:
+                return False
+
+            task = dict(self.current_task)
+            task['answer'] = answer
+            task['accept'] = list(self.current_labels) if answer == 'accept' else []
+            task['_timestamp'] = int(time.time())
+            self.pending_answers.append(task)
+
+            self.current_task = None
+            self.current_labels = []
+
+            if len(self.pending_answers) >= self.batch_size:
+                self.auto_save_progress()
+            return True
+
+    @timed('api.submit_task')
+    def submit_task(self):
+        if self._answer_current('accept'):
+            print("   ✅ Task submitted successfully")
+            return True
+        print("   ❌ No task to submit")
+        return False
+
+    @timed('api.click_ignore')
+    def click_ignore(self):
+        if self._answer_current('ignore'):
+            print("   ⏭️ Task ignored/skipped")
+            return True
+        print("   ❌ No task to ignore")
+        return False
+
+    @timed('api.auto_save_progress')
+    def auto_save_progress(self):
+        if not self.pending_answers:
+            return True
+
+        with self.lock:
+            answers = self.pending_answers
+            self.pending_answers = []
+        try:
+            self._request('post', 'give_answers', {'answers': answers, 'session_id': self.session_id})
+            print(f"   💾 Progress saved successfully ({len(answers)} answers)")
+            return True
+        except Exception as e:
+            with self.lock:
+                self.pending_answers = answers + self.pending_answers
+            print(f"   ❌ Error saving answers: {e}")
+            return False
+
+    @timed('api.check_no_tasks')
+    def check_no_tasks(self):
+        try:
+            return self._ensure_current() is None
+        except Exception as e:
+            print(f"   Error checking task status: {e}")
+            return False
+
+    def unsaved_count(self):
+        with self.lock:
+            return len(self.pending_answers)
+
+    def close(self):
+        if self.pending_answers:
+            self.auto_save_progress()
+        self.http.close()
+        print("   API session closed")
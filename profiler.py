@@ -0,0 +1,113 @@
+import csv
+import functools
+import json
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+import numpy as np
+
+PERCENTILES = (50, 95, 99)
+
+# Timer that @timed methods report to; None keeps them at a single global check
+_active_timer = None
+
+
+class StageTimer:
+    def __init__(self):
+        self.durations = defaultdict(list)
+        self.lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.task_times = deque()
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name, seconds):
+        with self.lock:
+            self.durations[name].append(seconds)
+
+    def task_done(self):
+        self.task_times.append(time.perf_counter())
+
+    def tasks_per_minute(self, window=60.0):
+        now = time.perf_counter()
+        while self.task_times and now - self.task_times[0] > window:
+            self.task_times.popleft()
+        span = min(window, now - self.started)
+        return len(self.task_times) / span * 60 if span > 0 else 0.0
+
+    def summary(self):
+        with self.lock:
+            durations = {name: np.array(values) for name, values in self.durations.items()}
+
+        rows = []
+        for name, values in durations.items():
+            p50, p95, p99 = np.percentile(values, PERCENTILES) * 1000
+            rows.append({
+                'stage': name,
+                'count': len(values),
+                'total_s': round(float(values.sum()), 4),
+                'mean_ms': round(float(values.mean()) * 1000, 3),
+                'p50_ms': round(float(p50), 3),
+                'p95_ms': round(float(p95), 3),
+                'p99_ms': round(float(p99), 3),
+                'max_ms': round(float(values.max()) * 1000, 3)
+            })
+        return rows
+
+    def report(self):
+        rows = self.summary()
+        if not rows:
+            return
+
+        print(f"\n⏱️ Stage latency:")
+        for row in rows:
+            print(f"   {row['stage']:<32} n={row['count']:<5} mean={row['mean_ms']:8.1f}ms  "
+                  f"p50={row['p50_ms']:8.1f}ms  p95={row['p95_ms']:8.1f}ms  "
+                  f"p99={row['p99_ms']:8.1f}ms  max={row['max_ms']:8.1f}ms")
+
+    def export(self, path):
+        rows = self.summary()
+        if path.endswith('.csv'):
+            with open(path, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.DictWriter(f, fieldnames=list(rows[0]) if rows else ['stage'])
+                writer.writeheader()
+                writer.writerows(rows)
+        else:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump({'elapsed_s': round(time.perf_counter() - self.started, 3), 'stages': rows}, f, indent=2)
+        print(f"   Profile written to {path}")
+
+
+def activate(timer):
+    global _active_timer
+    _active_timer = timer
+
+
+def deactivate():
+    global _active_timer
+    _active_timer = None
+
+
+def timed(name):
+    """Record every call of the decorated function under ``name`` while a timer is active."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            timer = _active_timer
+            if timer is None:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                timer.record(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
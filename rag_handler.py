@@ -1,50 +1,513 @@
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+import hashlib
+import sys
+import threading
 import numpy as np
-from config import SIMILARITY_THRESHOLD
+from config import (
+    SIMILARITY_THRESHOLD, MIN_LABEL_VOTE, LABEL_MAPPING, PREDICT_BATCH_SIZE, SEARCH_BACKEND, KB_COMPACT_EVERY,
+    TFIDF_MAX_FEATURES, TFIDF_NGRAM_RANGE, COMPACT_MEMORY, VECTORIZER, HASHING_FEATURES, PREDICTOR
+)
+from ann_index import LSHIndex
+from compact_store import TextBuffer, LabelCodes, KnowledgeEntries, object_nbytes
+from delta_index import DeltaIndex
+from inverted_index import InvertedIndex
+from linear_predictor import LinearPredictor
+from prediction_cache import PredictionCache
+from profiler import timed
+from tfidf import HashingTfidf
 
 class RAGHandler:
-    def __init__(self):
-        self.vectorizer = TfidfVectorizer(
-            max_features=1000, 
-            ngram_range=(1,2),
-            stop_words=None,
-            lowercase=True
-        )
+    def __init__(self, search_backend=SEARCH_BACKEND, similarity_threshold=SIMILARITY_THRESHOLD,
+                 min_label_vote=MIN_LABEL_VOTE, max_features=TFIDF_MAX_FEATURES, ngram_range=TFIDF_NGRAM_RANGE,
+                 vectorizer=VECTORIZER, compact_memory=COMPACT_MEMORY, predictor=PREDICTOR):
+        if predictor not in ("knn", "linear"):
+            raise ValueError(f"Unknown predictor: {predictor}")
+        self.predictor = predictor
+        # Fitted LinearPredictor when predictor == "linear"
+        self.linear = None
+        self.vectorizer_kind = vectorizer
+        if vectorizer == "hashing":
+            self.vectorizer_params = {
+                'n_features': HASHING_FEATURES,
+                'ngram_range': tuple(ngram_range),
+                'lowercase': True
+            }
+        elif vectorizer == "tfidf":
+            self.vectorizer_params = {
+                'max_features': max_features,
+                'ngram_range': tuple(ngram_range),
+                'stop_words': None,
+                'lowercase': True
+            }
+        else:
+            raise ValueError(f"Unknown vectorizer: {vectorizer}")
+        self.compact_memory = compact_memory
+        # Fitted on demand, or replaced by a FrozenTfidf when a cached index is loaded
+        self.vectorizer = None
+        self.similarity_threshold = similarity_threshold
+        self.min_label_vote = min_label_vote
         self.vectors = None
         self.knowledge_data = []
-    
+        self.texts = []
+        self.label_names = np.array(list(LABEL_MAPPING))
+        self.label_matrix = None
+        self.search_backend = search_backend
+        self.search_index = None
+        self.prediction_cache = PredictionCache()
+        self.delta = None
+        self.doc_lookup = None
+        self.base_version = None
+        self.delta_version = ""
+        self.index_lock = threading.RLock()
+        self.compaction = None
+        self.added = 0
+        self.compactions = 0
+
+    @property
+    def similarity_threshold(self):
+        return self._similarity_threshold
+
+    @similarity_threshold.setter
+    def similarity_threshold(self, threshold):
+        self._similarity_threshold = threshold
+        if getattr(self, 'vectors', None) is None:
+            return
+        with self.index_lock:
+            # Cached neighbours of the inverted index were pruned with the old threshold
+            self.base_version = self._base_version()
+            self.prediction_cache.invalidate(self.base_version)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['index_lock'] = None
+        state['compaction'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.index_lock = threading.RLock()
+
     def setup_vectorstore(self, knowledge_data):
-        self.knowledge_data = knowledge_data
-        texts = [item['text'] for item in knowledge_data]
-        
-        print(f"   Processing {len(texts)} texts...")
-        self.vectors = self.vectorizer.fit_transform(texts)
+        """Fit the index on ``knowledge_data``, a list or any iterable of knowledge entries.
+
+        An iterable is consumed once; only a compact index avoids keeping its
+        entries, so the standard one stores them as a list.
+        """
+        if self.compact_memory:
+            self._build_documents(knowledge_data)
+            # Entries are rebuilt from texts and label codes on access instead of kept as dicts
+            self.knowledge_data = KnowledgeEntries(self)
+        else:
+            self.knowledge_data = knowledge_data if isinstance(knowledge_data, list) else list(knowledge_data)
+            self._build_documents(self.knowledge_data)
+
+        print(f"   Processing {len(self.texts)} unique texts ({len(self.knowledge_data)} knowledge entries)...")
+        self.vectorizer = self._new_vectorizer()
+        self.vectors = self.vectorizer.fit_transform(self.texts)
+        if self.compact_memory:
+            self._compact_vectorizer(self.vectorizer)
+        if self.predictor == "linear":
+            self.linear = LinearPredictor().fit(self.vectors, self.label_matrix)
+        self.finalize_index()
         print(f"   TF-IDF vectorizer ready with {self.vectors.shape[0]} documents, {self.vectors.shape[1]} features")
-    
+
+    def _new_vectorizer(self):
+        if self.vectorizer_kind == "hashing":
+            return HashingTfidf(**self.vectorizer_params)
+        # scikit-learn is slow to import and only needed when fitting
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        return TfidfVectorizer(**self.vectorizer_params)
+
+    def _compact_vectors(self, vectors):
+        # float32 weights and int32 positions: half the bytes per stored term
+        vectors = vectors.tocsr()
+        vectors.data = vectors.data.astype(np.float32, copy=False)
+        vectors.indices = vectors.indices.astype(np.int32, copy=False)
+        vectors.indptr = vectors.indptr.astype(np.int32, copy=False)
+        return vectors
+
+    def _compact_vectorizer(self, vectorizer):
+        # max_features prunes the vocabulary in place, leaving a dict sized for every
+        # n-gram seen during the fit; a copy is sized for the terms actually kept
+        vectorizer.vocabulary_ = {term: int(idx) for term, idx in vectorizer.vocabulary_.items()}
+        # Older scikit-learn also keeps every pruned n-gram, only to explain the fit
+        if hasattr(vectorizer, 'stop_words_'):
+            del vectorizer.stop_words_
+
+    def _compact_texts(self, texts):
+        return texts if isinstance(texts, TextBuffer) else TextBuffer.from_texts(texts)
+
+    def finalize_index(self):
+        # Called whenever the index is (re)built or loaded
+        if self.compact_memory:
+            self.vectors = self._compact_vectors(self.vectors)
+            self.texts = self._compact_texts(self.texts)
+            if not isinstance(self.label_matrix, LabelCodes):
+                self.label_matrix = LabelCodes(self.label_matrix)
+        self.build_search_index()
+        self._reset_delta()
+        self.base_version = self._base_version()
+        self.prediction_cache.invalidate(self.base_version)
+
+    def index_version(self):
+        return f"{self.base_version}:{self.delta_version}"
+
+    def _reset_delta(self):
+        self.delta = DeltaIndex(self.vectors.shape[1], len(self.label_names))
+        self.doc_lookup = None
+        self.delta_version = ""
+
+    def _bump_delta_version(self, text, labels):
+        # Chained hash of every addition, so the cache key changes in O(1)
+        entry = repr((self.delta_version, text, sorted(map(str, labels))))
+        self.delta_version = hashlib.sha1(entry.encode()).hexdigest()
+
+    def _base_version(self):
+        digest = hashlib.sha1()
+        for array in (self.vectors.data, self.vectors.indices, self.vectors.indptr, self.label_matrix):
+            digest.update(np.ascontiguousarray(array).tobytes())
+        if self.linear is not None:
+            digest.update(self.linear.coef.tobytes() + self.linear.thresholds.tobytes())
+        digest.update(repr((list(self.label_names), self.similarity_threshold, self.min_label_vote, self.search_backend,
+                            self.predictor)).encode())
+        return digest.hexdigest()
+
+    def build_search_index(self):
+        self.search_index = self._make_search_index(self.vectors)
+
+    def _make_search_index(self, vectors):
+        if self.search_backend == "exact":
+            return None
+        if self.search_backend == "lsh":
+            return LSHIndex().fit(vectors)
+        if self.search_backend == "inverted":
+            return InvertedIndex(self.similarity_threshold).fit(vectors)
+        raise ValueError(f"Unknown search backend: {self.search_backend}")
+
+    def _label_row(self, labels):
+        lookup = {str(label): i for i, label in enumerate(self.label_names)}
+        for label in labels:
+            if label not in lookup:
+                lookup[label] = len(lookup)
+                self.label_names = np.append(self.label_names, label)
+
+        n_labels = len(self.label_names)
+        if n_labels > self.label_matrix.shape[1]:
+            padded = np.pad(np.asarray(self.label_matrix), ((0, 0), (0, n_labels - self.label_matrix.shape[1])))
+            self.label_matrix = LabelCodes(padded) if self.compact_memory else padded
+            self.delta.resize_labels(n_labels)
+
+        row = np.zeros(n_labels, dtype=bool)
+        row[[lookup[label] for label in labels]] = True
+        return row
+
+    def _find_document(self, text):
+        if isinstance(self.texts, TextBuffer):
+            return self.texts.find(text)
+        if self.doc_lookup is None:
+            self.doc_lookup = {doc: i for i, doc in enumerate(self.texts)}
+        return self.doc_lookup.get(text)
+
+    @timed('rag.add_annotation')
+    def add_annotation(self, text, labels):
+        """Make an accepted annotation searchable without refitting the vectorizer.
+
+        The text is encoded with the current vocabulary and IDF weights and
+        appended to the delta buffer, or its labels are merged into the
+        existing document. Every ``KB_COMPACT_EVERY`` new documents a
+        background refit folds the buffer into the main index.
+        """
+        if self.vectors is None or not labels:
+            return False
+
+        with self.index_lock:
+            label_row = self._label_row(labels)
+            doc_idx = self._find_document(text)
+            if doc_idx is not None:
+                current = self.label_matrix[doc_idx]
+                new_labels = label_row & ~current
+                self.label_matrix[doc_idx] = current | label_row
+            else:
+                delta_idx = self.delta.lookup.get(text)
+                if delta_idx is not None:
+                    new_labels = label_row & ~self.delta.labels[delta_idx]
+                    self.delta.labels[delta_idx] |= label_row
+                else:
+                    new_labels = label_row
+                    self.delta.append(text, self.vectorizer.transform([text]), label_row)
+
+            if not new_labels.any():
+                return False
+
+            # A compact index derives its entries from the label codes, already updated above
+            for label in self.label_names[new_labels] if isinstance(self.knowledge_data, list) else []:
+                aspect, sentiment = str(label).rsplit('_', 1)
+                self.knowledge_data.append({
+                    'text': text,
+                    'aspect': aspect,
+                    'sentiment': sentiment,
+                    'prodigy_label': str(label)
+                })
+            # Cached base-index neighbours stay valid: the delta and label merges are applied per lookup
+            self._bump_delta_version(text, labels)
+            self.added += 1
+
+            if KB_COMPACT_EVERY and len(self.delta) >= KB_COMPACT_EVERY:
+                self.compact(background=True)
+        return True
+
+    def compact(self, background=False):
+        """Refit vocabulary and IDF over the base documents plus the delta buffer."""
+        with self.index_lock:
+            running = self.compaction is not None and self.compaction.is_alive()
+            if background:
+                if not running:
+                    self.compaction = threading.Thread(target=self._compact, daemon=True)
+                    self.compaction.start()
+                return
+
+        if running:
+            self.compaction.join()
+        self._compact()
+
+    @timed('rag.compact')
+    def _compact(self):
+        with self.index_lock:
+            n_folded = len(self.delta)
+            if n_folded == 0:
+                return
+            texts = list(self.texts) + self.delta.texts
+            if self.predictor == "linear":
+                # The linear model trains on the labels as they are now; later merges wait for the next refit
+                labels = np.vstack([np.asarray(self.label_matrix), self.delta.label_matrix()[:n_folded]])
+
+        # The refit runs outside the lock so predictions keep being served meanwhile
+        vectorizer = self._new_vectorizer()
+        vectors = vectorizer.fit_transform(texts)
+        if self.compact_memory:
+            vectors = self._compact_vectors(vectors)
+            texts = self._compact_texts(texts)
+            self._compact_vectorizer(vectorizer)
+        search_index = self._make_search_index(vectors)
+        linear = LinearPredictor().fit(vectors, labels) if self.predictor == "linear" else None
+
+        with self.index_lock:
+            # Labels are read only now so merges made during the refit are kept
+            pending = self.delta
+            label_matrix = np.vstack([np.asarray(self.label_matrix), pending.label_matrix()[:n_folded]])
+            self.label_matrix = LabelCodes(label_matrix) if self.compact_memory else label_matrix
+            self.vectorizer = vectorizer
+            self.vectors = vectors
+            self.texts = texts
+            self.search_index = search_index
+            self.linear = linear
+            self._reset_delta()
+
+            # Documents added during the refit are re-encoded with the new weights
+            for row in range(n_folded, len(pending)):
+                text = pending.texts[row]
+                self.delta.append(text, vectorizer.transform([text]), pending.labels[row])
+                self._bump_delta_version(text, self.label_names[pending.labels[row]].tolist())
+
+            self.base_version = self._base_version()
+            self.prediction_cache.invalidate(self.base_version)
+            self.compactions += 1
+
+    def report_updates(self):
+        if not self.added:
+            return
+        print(f"\n📚 Knowledge base updates:")
+        print(f"   annotations added={self.added} pending={len(self.delta)} compactions={self.compactions}")
+
+    def memory_report(self):
+        """Approximate bytes held by each part of the index, in total and per knowledge entry."""
+        knowledge_data = self.knowledge_data
+        if isinstance(knowledge_data, list):
+            # Entry dicts share their strings with the texts and label table, so only the containers count
+            knowledge_bytes = sys.getsizeof(knowledge_data) + sum(sys.getsizeof(item) for item in knowledge_data)
+        else:
+            knowledge_bytes = sys.getsizeof(knowledge_data)
+
+        vectorizer = self.vectorizer
+        parts = {
+            'vectors': sum(array.nbytes for array in (self.vectors.data, self.vectors.indices, self.vectors.indptr)),
+            'texts': object_nbytes(self.texts),
+            'labels': object_nbytes(self.label_matrix),
+            'knowledge_data': knowledge_bytes,
+            'vocabulary': object_nbytes(getattr(vectorizer, 'vocabulary_', {}))
+                          + object_nbytes(getattr(vectorizer, 'stop_words_', None) or [])
+                          + object_nbytes(getattr(vectorizer, 'idf_', np.zeros(0))),
+            'doc_lookup': object_nbytes(self.doc_lookup or {}) if self.doc_lookup is not None else 0
+        }
+        total = sum(parts.values())
+        n_entries = len(knowledge_data)
+        return {
+            'parts': parts,
+            'total_bytes': total,
+            'documents': self.vectors.shape[0],
+            'entries': n_entries,
+            'bytes_per_entry': total / n_entries if n_entries else 0.0
+        }
+
+    def report_memory(self):
+        report = self.memory_report()
+        mode = "compact" if self.compact_memory else "standard"
+        print(f"\n💾 Index memory ({mode}, {self.vectorizer_kind} vectorizer): "
+              f"{report['total_bytes'] / 2**20:.1f} MiB, {report['bytes_per_entry']:.0f} bytes/entry "
+              f"over {report['entries']} entries")
+        for part, nbytes in report['parts'].items():
+            print(f"   {part:<15} {nbytes / 2**20:8.2f} MiB")
+
+    def _build_documents(self, knowledge_data):
+        # One row per unique sentence carrying the set of its labels
+        label_names = list(self.label_names)
+        label_lookup = {label: i for i, label in enumerate(label_names)}
+        doc_lookup = {}
+        rows = []
+        cols = []
+
+        for item in knowledge_data:
+            label = item['prodigy_label']
+            if label not in label_lookup:
+                label_lookup[label] = len(label_names)
+                label_names.append(label)
+            rows.append(doc_lookup.setdefault(item['text'], len(doc_lookup)))
+            cols.append(label_lookup[label])
+
+        self.texts = list(doc_lookup)
+        self.label_names = np.array(label_names)
+        self.label_matrix = np.zeros((len(self.texts), len(label_names)), dtype=bool)
+        self.label_matrix[rows, cols] = True
+
+    def _top_k(self, similarities, k):
+        k = min(k, similarities.shape[1])
+        if k < similarities.shape[1]:
+            top_indices = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+        else:
+            top_indices = np.tile(np.arange(k), (similarities.shape[0], 1))
+
+        top_scores = np.take_along_axis(similarities, top_indices, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind='stable')
+        return np.take_along_axis(top_indices, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+
+    def _base_neighbours(self, query_vectors, k):
+        if isinstance(self.search_index, InvertedIndex):
+            # Its pruning depends on the threshold, which may have changed since it was built
+            return self.search_index.search(query_vectors, k, self.similarity_threshold)
+        if self.search_index is not None:
+            return self.search_index.search(query_vectors, k)
+        # TF-IDF rows are L2-normalised, so the sparse dot product is the cosine similarity
+        similarities = (query_vectors @ self.vectors.T).toarray()
+        return self._top_k(similarities, k)
+
+    def _neighbours(self, query_vectors, k):
+        return self._merge_delta(query_vectors, *self._base_neighbours(query_vectors, k), k)
+
+    def _merge_delta(self, query_vectors, top_indices, top_scores, k):
+        if len(self.delta) == 0:
+            return top_indices, top_scores
+
+        # Documents added since the last fit are searched exactly and merged in
+        delta_scores = self.delta.similarities(query_vectors)
+        delta_indices = np.broadcast_to(self.vectors.shape[0] + np.arange(len(self.delta)), delta_scores.shape)
+        positions, top_scores = self._top_k(np.hstack([top_scores, delta_scores]), k)
+        return np.take_along_axis(np.hstack([top_indices, delta_indices]), positions, axis=1), top_scores
+
+    def _neighbour_labels(self, top_indices):
+        if len(self.delta) == 0:
+            return self.label_matrix[top_indices]
+
+        n_base = self.label_matrix.shape[0]
+        in_base = top_indices < n_base
+        labels = np.empty(top_indices.shape + (self.label_matrix.shape[1],), dtype=bool)
+        labels[in_base] = self.label_matrix[top_indices[in_base]]
+        labels[~in_base] = self.delta.label_matrix()[top_indices[~in_base] - n_base]
+        return labels
+
+    @timed('rag.predict_batch')
+    def predict_batch(self, texts, k=3):
+        """Score every label for each text from its top-k neighbours.
+
+        Returns ``(labels, scores)``: the label table and an array of shape
+        ``(len(texts), len(labels))`` holding each label's vote, the summed
+        similarity of the neighbours above ``similarity_threshold`` carrying it.
+        Labels whose share of the vote is below ``min_label_vote`` score 0.
+
+        With the linear predictor a score is instead the label's probability,
+        or 0 below its calibrated threshold, and ``k`` is unused. Documents
+        added since the last fit only reach it through the next compaction.
+        """
+        with self.index_lock:
+            label_names = self.label_names
+            scores = np.zeros((len(texts), len(label_names)))
+            if self.vectors is None or len(texts) == 0:
+                return label_names, scores
+
+            for start in range(0, len(texts), PREDICT_BATCH_SIZE):
+                batch = texts[start:start + PREDICT_BATCH_SIZE]
+                query_vectors = self.vectorizer.transform(batch)
+                if self.linear is not None:
+                    scores[start:start + len(batch)] = self.linear.predict_scores(query_vectors, len(label_names))
+                    continue
+
+                scores[start:start + len(batch)] = self._votes(*self._neighbours(query_vectors, k))
+
+        return label_names, scores
+
+    def _votes(self, top_indices, top_scores):
+        top_scores = np.where(top_scores > self.similarity_threshold, top_scores, 0.0)
+        votes = np.einsum('nk,nkl->nl', top_scores, self._neighbour_labels(top_indices))
+        total = top_scores.sum(axis=1, keepdims=True)
+        return np.where((votes > 0) & (votes >= self.min_label_vote * total), votes, 0.0)
+
+    def _predict_cached(self, text, k):
+        """``predict_batch`` for one text, reusing what the prediction cache holds for it.
+
+        The cache keeps what only a refit changes: the base index's
+        neighbours, or the linear scores. Documents added since then and
+        labels merged into base documents are applied on every lookup, so
+        accepting a task does not empty the cache.
+        """
+        with self.index_lock:
+            label_names = self.label_names
+            cached = self.prediction_cache.get(text, k)
+            query_vectors = None
+            if cached is None:
+                query_vectors = self.vectorizer.transform([text])
+                if self.linear is not None:
+                    cached = self.linear.predict_scores(query_vectors)
+                else:
+                    cached = self._base_neighbours(query_vectors, k)
+                self.prediction_cache.put(text, k, cached)
+
+            if self.linear is not None:
+                scores = cached
+                if len(label_names) > scores.shape[1]:
+                    scores = np.pad(scores, ((0, 0), (0, len(label_names) - scores.shape[1])))
+                return label_names, scores
+
+            top_indices, top_scores = cached
+            if len(self.delta):
+                if query_vectors is None:
+                    query_vectors = self.vectorizer.transform([text])
+                top_indices, top_scores = self._merge_delta(query_vectors, top_indices, top_scores, k)
+            return label_names, self._votes(top_indices, top_scores)
+
+    def labels_from_scores(self, label_names, row):
+        order = [idx for idx in np.argsort(-row, kind='stable') if row[idx] > 0]
+        return [str(label_names[idx]) for idx in order]
+
+    @timed('rag.find_labels_to_annotate')
     def find_labels_to_annotate(self, query_text, k=3):
         if self.vectors is None:
             return []
-        
-        query_vector = self.vectorizer.transform([query_text])
-        similarities = cosine_similarity(query_vector, self.vectors)[0]
-        
-        top_indices = np.argsort(similarities)[-k:][::-1]
-        
-        labels_to_annotate = []
-        similarity_scores = []
-        
-        for idx in top_indices:
-            similarity_score = similarities[idx]
-            if similarity_score > SIMILARITY_THRESHOLD:
-                label = self.knowledge_data[idx]['prodigy_label']
-                if label not in labels_to_annotate:
-                    labels_to_annotate.append(label)
-                    similarity_scores.append(similarity_score)
-        
+
+        label_names, scores = self._predict_cached(query_text, k)
+        labels_to_annotate = self.labels_from_scores(label_names, scores[0])
+        similarity_scores = np.sort(scores[0])[::-1][:len(labels_to_annotate)].tolist()
+
         if labels_to_annotate:
             print(f"   Found {len(labels_to_annotate)} potential labels:")
             for label, score in zip(labels_to_annotate, similarity_scores):
                 print(f"     - {label}: {score:.3f}")
-        
+
         return labels_to_annotate
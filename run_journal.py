@@ -0,0 +1,169 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+from config import JOURNAL_FLUSH_EVERY, JOURNAL_FLUSH_SECONDS
+
+
+def text_hash(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def _key(task_hash, text_digest):
+    # Prodigy's task hash tells a repeated sentence apart from the same task served again
+    return f"task:{task_hash}" if task_hash is not None else text_digest
+
+
+class RunJournal:
+    """Append-only JSONL log of every task outcome, used to resume a crashed run.
+
+    ``record`` only appends to an in-memory buffer. A background thread writes
+    and fsyncs the buffer every ``flush_every`` records or ``flush_seconds``,
+    so the journal never adds disk latency to a task. A crash loses at most
+    the unflushed tail; those tasks are simply predicted again.
+
+    ``mark_saved`` records that Prodigy has every answer so far. Only tasks
+    answered after the last save can come back after a crash, so only those
+    are replayed; a sentence that merely appears again is a new task.
+
+    The first record names the Prodigy ``session`` the journal belongs to. A
+    journal left by another session is moved aside to ``<path>.stale`` and a
+    new one is started. ``finish`` closes out a run that ended normally, so
+    the next run does not resume it.
+    """
+
+    def __init__(self, path, session=None, flush_every=JOURNAL_FLUSH_EVERY, flush_seconds=JOURNAL_FLUSH_SECONDS):
+        self.path = path
+        self.session = session
+        self.flush_every = flush_every
+        self.flush_seconds = flush_seconds
+        self.unsaved = {}
+        self.tasks = 0
+        self.errors = 0
+        self.resumed = 0
+        self.buffer = []
+        self.condition = threading.Condition()
+        self.closed = False
+        self.flushes = 0
+        self._load()
+        self.file = open(path, 'a', encoding='utf-8')
+        if not self.resumed:
+            self._append({'ts': round(time.time(), 3), 'action': 'session', 'session': session})
+        self.thread = threading.Thread(target=self._flush_loop, daemon=True)
+        self.thread.start()
+
+    def _apply(self, record):
+        action = record['action']
+        if action == 'session':
+            return
+        if action == 'save':
+            self.unsaved.clear()
+            return
+
+        # Replaying a decision resends an answer counted when it was first made
+        if action == 'error' or not record.get('replay'):
+            self.tasks += 1
+            self.errors += action == 'error'
+        if action != 'error' and record.get('text_hash'):
+            self.unsaved[_key(record.get('task_hash'), record['text_hash'])] = record
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+
+        records = []
+        valid_bytes = 0
+        with open(self.path, 'rb') as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    # A torn final line from a crash mid-write; drop it
+                    break
+                valid_bytes += len(line)
+
+        header = records[0] if records else {}
+        if records and (header.get('action') != 'session' or header.get('session') != self.session):
+            print(f"   ⚠️ Journal {self.path} belongs to session {header.get('session')!r}, "
+                  f"not {self.session!r}; moved to {self.path}.stale")
+            os.replace(self.path, f"{self.path}.stale")
+            return
+
+        for record in records:
+            self._apply(record)
+        self.resumed = len(records)
+
+        if valid_bytes < os.path.getsize(self.path):
+            with open(self.path, 'r+b') as f:
+                f.truncate(valid_bytes)
+
+    def counts(self):
+        """Return ``(tasks, successes, errors)``; a replayed task is not counted again."""
+        return self.tasks, self.tasks - self.errors, self.errors
+
+    def decision(self, text, task_hash=None):
+        """The accept/ignore recorded for this task since the last save, or None.
+
+        A decision is handed out once; replaying it records it again.
+        """
+        return self.unsaved.pop(_key(task_hash, text_hash(text)), None)
+
+    def record(self, text, labels, action, seconds, task_hash=None, replay=False):
+        record = {
+            'ts': round(time.time(), 3),
+            'text_hash': text_hash(text) if text else None,
+            'labels': list(labels),
+            'action': action,
+            'seconds': round(seconds, 4)
+        }
+        if task_hash is not None:
+            record['task_hash'] = task_hash
+        if replay:
+            record['replay'] = True
+        self._append(record)
+
+    def mark_saved(self):
+        """Record that every answer so far reached Prodigy, so none of them can be served again."""
+        if self.unsaved:
+            self._append({'ts': round(time.time(), 3), 'action': 'save'})
+
+    def _append(self, record):
+        self._apply(record)
+        with self.condition:
+            self.buffer.append(json.dumps(record, ensure_ascii=False))
+            if len(self.buffer) >= self.flush_every:
+                self.condition.notify()
+
+    def _write(self, lines):
+        self.file.write('\n'.join(lines) + '\n')
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.flushes += 1
+
+    def _flush_loop(self):
+        while True:
+            with self.condition:
+                if not self.closed and len(self.buffer) < self.flush_every:
+                    self.condition.wait(self.flush_seconds)
+                lines, self.buffer = self.buffer, []
+                closed = self.closed
+            if lines:
+                self._write(lines)
+            if closed:
+                return
+
+    def close(self):
+        with self.condition:
+            if self.closed:
+                return
+            self.closed = True
+            self.condition.notify()
+        self.thread.join()
+        self.file.close()
+
+    def finish(self):
+        """Close the journal of a run that ended normally and move it to ``<path>.done``."""
+        self.close()
+        os.replace(self.path, f"{self.path}.done")
@@ -0,0 +1,66 @@
+import time
+
+from config import AUTO_SAVE_INTERVAL, AUTO_SAVE_SECONDS, AUTO_SAVE_BADGE_THRESHOLD
+
+
+class SaveScheduler:
+    """Decides when finished tasks are saved instead of saving after every one.
+
+    A save is due after ``interval`` unsaved tasks, ``seconds`` since the last
+    save, or once Prodigy's own unsaved-answers badge reaches
+    ``badge_threshold``. A value of 0 turns a trigger off. Every successful
+    save is marked in ``journal``, if one is given.
+    """
+
+    def __init__(self, interval=AUTO_SAVE_INTERVAL, seconds=AUTO_SAVE_SECONDS,
+                 badge_threshold=AUTO_SAVE_BADGE_THRESHOLD, journal=None):
+        self.interval = interval
+        self.seconds = seconds
+        self.badge_threshold = badge_threshold
+        self.journal = journal
+        self.unsaved = 0
+        self.last_save = time.perf_counter()
+        self.saves = 0
+        self.failed_saves = 0
+        self.save_seconds = 0.0
+
+    def task_done(self):
+        self.unsaved += 1
+
+    def due(self, prodigy):
+        if self.unsaved == 0:
+            return False
+        if self.interval and self.unsaved >= self.interval:
+            return True
+        if self.seconds and time.perf_counter() - self.last_save >= self.seconds:
+            return True
+        if self.badge_threshold:
+            badge = prodigy.unsaved_count()
+            return badge is not None and badge >= self.badge_threshold
+        return False
+
+    def save(self, prodigy, timer=None):
+        start = time.perf_counter()
+        saved = prodigy.auto_save_progress()
+        elapsed = time.perf_counter() - start
+        if timer:
+            timer.record('save', elapsed)
+
+        self.save_seconds += elapsed
+        self.last_save = time.perf_counter()
+        if saved:
+            self.saves += 1
+            self.unsaved = 0
+            if self.journal:
+                self.journal.mark_saved()
+        else:
+            self.failed_saves += 1
+        return saved
+
+    def report(self, total_seconds):
+        print(f"\n💾 Save schedule:")
+        print(f"   saves={self.saves} failed={self.failed_saves} unsaved={self.unsaved}")
+        if total_seconds > 0:
+            share = self.save_seconds / total_seconds * 100
+            print(f"   save time {self.save_seconds:.1f}s vs annotation {total_seconds - self.save_seconds:.1f}s "
+                  f"({share:.1f}% of the run)")
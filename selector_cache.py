@@ -0,0 +1,72 @@
+import json
+import os
+import tempfile
+from collections import Counter
+
+from config import SELECTOR_CACHE_PATH
+
+
+class SelectorCache:
+    """Remembers which selector last worked for each action and tries it first next time."""
+
+    def __init__(self, path=SELECTOR_CACHE_PATH):
+        self.path = path
+        self.winners = {}
+        self.hits = Counter()
+        self.misses = Counter()
+        self.load()
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                self.winners = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"   ⚠️ Ignoring unreadable selector cache {self.path}: {e}")
+            self.winners = {}
+
+    def save(self):
+        if not self.path:
+            return
+        # A temp file of its own per save, so pool workers sharing the cache never write the same one
+        directory, name = os.path.split(os.path.abspath(self.path))
+        with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=directory, prefix=name + ".",
+                                         suffix=".tmp", delete=False) as f:
+            json.dump(self.winners, f, indent=2)
+        try:
+            os.replace(f.name, self.path)
+        except OSError:
+            os.unlink(f.name)
+            raise
+
+    def ordered(self, action, selectors):
+        winner = self.winners.get(action)
+        if winner not in selectors:
+            return list(selectors)
+        return [winner] + [selector for selector in selectors if selector != winner]
+
+    def record(self, action, selector):
+        if selector is not None and self.winners.get(action) == selector:
+            self.hits[action] += 1
+            return
+
+        self.misses[action] += 1
+        if selector is not None:
+            self.winners[action] = selector
+            try:
+                self.save()
+            except OSError as e:
+                print(f"   ⚠️ Could not save selector cache: {e}")
+
+    def report(self):
+        actions = sorted(set(self.hits) | set(self.misses))
+        if not actions:
+            return
+
+        print(f"\n🎯 Selector cache:")
+        for action in actions:
+            total = self.hits[action] + self.misses[action]
+            hit_rate = self.hits[action] / total * 100
+            print(f"   {action:<16} hits={self.hits[action]:<5} misses={self.misses[action]:<5} "
+                  f"hit rate={hit_rate:5.1f}%  -> {self.winners.get(action)}")
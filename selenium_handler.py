@@ -1,67 +1,139 @@
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
+from selenium.common.exceptions import TimeoutException
 import time
-import tempfile
-
-class ProdigyHandler:
-    def __init__(self, url):
+from annotation_backend import AnnotationBackend
+from driver_lifecycle import DriverLifecycle, launch_chrome
+from config import ADAPTIVE_WAITS, BATCHED_ACTIONS, BATCHED_SETTLE_SECONDS
+from dom_waits import (
+    AdaptiveWaiter, TASK_TEXT_SCRIPT, BATCH_ACTION_SCRIPT, UNSAVED_COUNT_SCRIPT,
+    task_text_changed, label_checked, element_disabled
+)
+from profiler import timed
+from selector_cache import SelectorCache
+
+TASK_TEXT_SELECTORS = [
+    ".prodigy-content",
+    ".prodigy-task",
+    "[data-prodigy-task]",
+    ".task-text",
+    ".annotation-text",
+    ".prodigy-task-text"
+]
+
+SUBMIT_XPATHS = [
+    "//button[contains(@class, 'prodigy-button-accept')]",
+    "//button[@data-key='accept']",
+    "//button[contains(@style, 'background') and contains(@style, 'green')]",
+    "//div[contains(@class, 'prodigy-button') and contains(@class, 'accept')]",
+    "//button[contains(@class, 'accept')]",
+    "//button[contains(@title, 'Accept')]",
+    "//button[contains(@aria-label, 'Accept')]",
+    "//*[@role='button' and contains(@class, 'accept')]"
+]
+
+class ProdigyHandler(AnnotationBackend):
+    def __init__(self, url, adaptive_waits=ADAPTIVE_WAITS, batched_actions=BATCHED_ACTIONS):
         self.url = url
         self.driver = None
+        self.waiter = None
+        self.lifecycle = None
+        self.adaptive_waits = adaptive_waits
+        self.batched_actions = batched_actions
+        self.last_action_result = None
+        self.selector_cache = SelectorCache()
         self.setup_driver()
     
     def setup_driver(self):
-        chrome_options = Options()
-        temp_dir = tempfile.mkdtemp()
-        
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-dev-shm-usage")
-        chrome_options.add_argument("--disable-gpu")
-        chrome_options.add_argument(f"--user-data-dir={temp_dir}")
-        chrome_options.add_argument("--disable-web-security")
-        chrome_options.add_argument("--disable-features=VizDisplayCompositor")
-        chrome_options.add_argument("--headless")
-        chrome_options.add_argument("--disable-extensions")
-        chrome_options.add_argument("--no-first-run")
-        chrome_options.add_argument("--disable-default-apps")
-        chrome_options.add_argument("--remote-debugging-port=0")
-        
+        # Adaptive waits poll explicitly, so a missing element must not block on the implicit wait
+        implicit_wait = 0 if self.adaptive_waits else 5
         try:
-            self.driver = webdriver.Chrome(options=chrome_options)
-            self.driver.implicitly_wait(5)
-            self.driver.set_page_load_timeout(30)
-            self.driver.get(self.url)
+            self.lifecycle = DriverLifecycle(lambda: launch_chrome(implicit_wait), self.url)
+            self._attach_driver()
             print("   Prodigy loaded successfully!")
         except Exception as e:
             print(f"   Error opening Chrome: {e}")
             raise
+
+    def _attach_driver(self):
+        self.driver = self.lifecycle.active.driver
+        if self.waiter is None:
+            self.waiter = AdaptiveWaiter(self.driver)
+        else:
+            # Wait timings are kept across browsers
+            self.waiter.driver = self.driver
+
+    def recycle_due(self, succeeded):
+        return self.lifecycle.check(succeeded) if self.lifecycle else None
+
+    def recycle(self, reason):
+        self.lifecycle.recycle(reason)
+        self._attach_driver()
+
+    def _find_clickable(self, name, xpaths):
+        # The selector that won last time is probed first; the rest only on a miss
+        xpaths = self.selector_cache.ordered(name, xpaths)
+        match = None
+        
+        if self.adaptive_waits:
+            match = self.waiter.first_clickable(name, xpaths, 2)
+        else:
+            for xpath in xpaths:
+                try:
+                    match = xpath, WebDriverWait(self.driver, 2).until(
+                        EC.element_to_be_clickable((By.XPATH, xpath))
+                    )
+                    break
+                except:
+                    continue
+        
+        self.selector_cache.record(name, match[0] if match else None)
+        return match[1] if match else None
+    
+    def _snapshot_text(self):
+        if not self.adaptive_waits:
+            return None
+        try:
+            match = self.driver.execute_script(TASK_TEXT_SCRIPT, TASK_TEXT_SELECTORS)
+            return match[1] if match else None
+        except Exception:
+            return None
+    
+    def _pause(self, seconds, name, condition=None, timeout=None):
+        # Fixed sleep in legacy mode; otherwise wait only as long as the condition needs
+        if not self.adaptive_waits:
+            time.sleep(seconds)
+            self.waiter.record(name, seconds)
+        elif condition is not None:
+            self.waiter.until(name, condition, timeout or seconds * 4)
     
+    @timed('selenium.get_current_text')
     def get_current_text(self):
         try:
             WebDriverWait(self.driver, 10).until(
                 EC.presence_of_element_located((By.TAG_NAME, "body"))
             )
             
-            selectors = [
-                ".prodigy-content",
-                ".prodigy-task",
-                "[data-prodigy-task]",
-                ".task-text",
-                ".annotation-text",
-                ".prodigy-task-text"
-            ]
+            selectors = self.selector_cache.ordered('task_text', TASK_TEXT_SELECTORS)
             
-            for selector in selectors:
-                try:
-                    text_element = WebDriverWait(self.driver, 2).until(
-                        EC.presence_of_element_located((By.CSS_SELECTOR, selector))
-                    )
-                    if text_element.text.strip():
-                        return text_element.text.strip()
-                except:
-                    continue
+            if self.adaptive_waits:
+                match = self.waiter.task_text('task_text', selectors, 2)
+                self.selector_cache.record('task_text', match[0] if match else None)
+                if match:
+                    return match[1]
+            else:
+                for selector in selectors:
+                    try:
+                        text_element = WebDriverWait(self.driver, 2).until(
+                            EC.presence_of_element_located((By.CSS_SELECTOR, selector))
+                        )
+                        if text_element.text.strip():
+                            self.selector_cache.record('task_text', selector)
+                            return text_element.text.strip()
+                    except:
+                        continue
+                self.selector_cache.record('task_text', None)
             
             try:
                 body_text = self.driver.find_element(By.TAG_NAME, "body").text
@@ -80,6 +152,7 @@ class ProdigyHandler:
             print(f"   Error getting text: {e}")
             return None
     
+    @timed('selenium.click_label')
     def click_label(self, label_name):
         try:
             formatted_label = label_name.upper()
@@ -100,21 +173,21 @@ class ProdigyHandler:
 
                 # Scroll to element and wait
                 self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", label_element)
-                time.sleep(0.5)
+                self._pause(0.5, 'scroll')
 
                 # Try multiple click methods
                 try:
                     # Method 1: Regular click
                     label_element.click()
                     print(f"   ✅ Selected label: {formatted_label}")
-                    time.sleep(0.5)
+                    self._pause(0.5, 'label_checked', label_checked(formatted_label))
                     return True
                 except:
                     try:
                         # Method 2: JavaScript click
                         self.driver.execute_script("arguments[0].click();", label_element)
                         print(f"   ✅ Selected label: {formatted_label} (JS click)")
-                        time.sleep(0.5)
+                        self._pause(0.5, 'label_checked', label_checked(formatted_label))
                         return True
                     except:
                         # Method 3: Action chains
@@ -122,7 +195,7 @@ class ProdigyHandler:
                         actions = ActionChains(self.driver)
                         actions.move_to_element(label_element).click().perform()
                         print(f"   ✅ Selected label: {formatted_label} (Action chains)")
-                        time.sleep(0.5)
+                        self._pause(0.5, 'label_checked', label_checked(formatted_label))
                         return True
 
             except Exception as e:
@@ -134,6 +207,7 @@ class ProdigyHandler:
             return False
 
 
+    @timed('selenium.annotate_text_spans')
     def annotate_text_spans(self, label_name):
         try:
             text_selectors = [
@@ -151,11 +225,11 @@ class ProdigyHandler:
                         text_element = text_elements[0]
                         
                         self.driver.execute_script("arguments[0].scrollIntoView(true);", text_element)
-                        time.sleep(0.2)
+                        self._pause(0.2, 'scroll')
                         
                         text_element.click()
                         print(f"   ✅ Annotated text for {label_name}")
-                        time.sleep(0.3)
+                        self._pause(0.3, 'span_click')
                         return True
                 except Exception as e:
                     continue
@@ -166,7 +240,7 @@ class ProdigyHandler:
                     if element.text and len(element.text) > 10:
                         element.click()
                         print(f"   ✅ Annotated clickable text for {label_name}")
-                        time.sleep(0.3)
+                        self._pause(0.3, 'span_click')
                         return True
             except:
                 pass
@@ -178,6 +252,7 @@ class ProdigyHandler:
             print(f"   ❌ Error annotating text: {e}")
             return False
 
+    @timed('selenium.process_multiple_labels')
     def process_multiple_labels(self, labels_list):
         success_count = 0
         
@@ -192,45 +267,91 @@ class ProdigyHandler:
             else:
                 print(f"   ❌ Failed to select label {label_name}")
             
-            time.sleep(0.5)
+            self._pause(0.5, 'between_labels')
         
         return success_count > 0
 
+    @timed('selenium.apply_labels_and_submit')
+    def apply_labels_and_submit(self, labels_list):
+        if not self.batched_actions:
+            return super().apply_labels_and_submit(labels_list)
+        
+        formatted_labels = [label.upper() for label in labels_list]
+        previous_text = self._snapshot_text()
+        submit_xpaths = self.selector_cache.ordered('submit_button', SUBMIT_XPATHS)
+        
+        try:
+            result = self.driver.execute_async_script(
+                BATCH_ACTION_SCRIPT, formatted_labels, submit_xpaths, int(BATCHED_SETTLE_SECONDS * 1000)
+            )
+        except Exception as e:
+            print(f"   ⚠️ Batched action failed ({e}), falling back to per-label clicks")
+            return super().apply_labels_and_submit(labels_list)
+        
+        self.last_action_result = result
+        applied = list(result['applied'])
+        unchecked = []
+        for label in result['unconfirmed']:
+            # Clicked but not checked yet: clicking again before React catches up would uncheck it
+            self._pause(0.5, 'label_checked', label_checked(label), timeout=2)
+            if label_checked(label)(self.driver):
+                applied.append(label)
+            else:
+                unchecked.append(label)
+        for label in applied:
+            print(f"   ✅ Selected label: {label}")
+        for label in result['missing']:
+            print(f"   ❌ Label '{label}' not found")
+        
+        if not applied and not unchecked:
+            print("   ⚠️ No label applied in batch, falling back to per-label clicks")
+            return super().apply_labels_and_submit(labels_list)
+        
+        if unchecked:
+            print(f"   ⚠️ {len(unchecked)} label(s) still unchecked after the batch, clicking them one by one")
+            if not self.process_multiple_labels(unchecked) and not applied:
+                print("❌ Gagal process labels")
+                return False
+        
+        if not result['submitted']:
+            # The batch also holds back accept while any label is unconfirmed
+            if not result['unconfirmed']:
+                print("   ⚠️ Accept button not found in batch, retrying submit")
+            return self.submit_task()
+        
+        self.selector_cache.record('submit_button', result['selector'])
+        print(f"   ✅ Task submitted successfully ({len(result['applied'])} labels)")
+        self._pause(0.5, 'task_changed', task_text_changed(TASK_TEXT_SELECTORS, previous_text), timeout=2)
+        return True
+    
+    @timed('selenium.submit_task')
     def submit_task(self):
         try:
-            selectors = [
-                "//button[contains(@class, 'prodigy-button-accept')]",
-                "//button[@data-key='accept']",
-                "//button[contains(@style, 'background') and contains(@style, 'green')]",
-                "//div[contains(@class, 'prodigy-button') and contains(@class, 'accept')]",
-                "//button[contains(@class, 'accept')]",
-                "//button[contains(@title, 'Accept')]",
-                "//button[contains(@aria-label, 'Accept')]",
-                "//*[@role='button' and contains(@class, 'accept')]"
-            ]
+            selectors = SUBMIT_XPATHS
             
-            for selector in selectors:
+            self._pause(0.5, 'pre_submit')
+            previous_text = self._snapshot_text()
+            task_changed = task_text_changed(TASK_TEXT_SELECTORS, previous_text)
+            
+            submit_btn = self._find_clickable('submit_button', selectors)
+            if submit_btn:
                 try:
-                    submit_btn = WebDriverWait(self.driver, 2).until(
-                        EC.element_to_be_clickable((By.XPATH, selector))
-                    )
-                    
                     self.driver.execute_script("arguments[0].scrollIntoView(true);", submit_btn)
-                    time.sleep(0.2)
+                    self._pause(0.2, 'scroll')
                     
                     submit_btn.click()
                     print(f"   ✅ Task submitted successfully")
-                    time.sleep(0.5)
+                    self._pause(0.5, 'task_changed', task_changed, timeout=2)
                     return True
                 except:
-                    continue
+                    pass
             
             try:
                 submit_buttons = self.driver.find_elements(By.XPATH, "//button[contains(text(), 'Submit') or contains(text(), 'Accept') or contains(text(), 'Next')]")
                 if submit_buttons:
                     submit_buttons[0].click()
                     print(f"   ✅ Task submitted with fallback method")
-                    time.sleep(0.5)
+                    self._pause(0.5, 'task_changed', task_changed, timeout=2)
                     return True
             except:
                 pass
@@ -242,6 +363,7 @@ class ProdigyHandler:
             print(f"   ❌ Error submitting task: {e}")
             return False
     
+    @timed('selenium.click_ignore')
     def click_ignore(self):
         try:
             selectors = [
@@ -252,17 +374,14 @@ class ProdigyHandler:
                 "//button[contains(@title, 'Ignore')]"
             ]
             
-            for selector in selectors:
-                try:
-                    ignore_btn = WebDriverWait(self.driver, 2).until(
-                        EC.element_to_be_clickable((By.XPATH, selector))
-                    )
-                    ignore_btn.click()
-                    print("   ⏭️ Task ignored/skipped")
-                    time.sleep(0.5)
-                    return True
-                except:
-                    continue
+            previous_text = self._snapshot_text()
+            
+            ignore_btn = self._find_clickable('ignore_button', selectors)
+            if ignore_btn:
+                ignore_btn.click()
+                print("   ⏭️ Task ignored/skipped")
+                self._pause(0.5, 'task_changed', task_text_changed(TASK_TEXT_SELECTORS, previous_text), timeout=2)
+                return True
             
             print("   ❌ Ignore button not found")
             return False
@@ -271,21 +390,25 @@ class ProdigyHandler:
             print(f"   ❌ Error clicking ignore: {e}")
             return False
     
+    @timed('selenium.auto_save_progress')
     def auto_save_progress(self):
         try:
-            # Wait sebentar untuk save button muncul setelah accept
-            time.sleep(1)
-
-            save_btn = WebDriverWait(self.driver, 5).until(
-                EC.element_to_be_clickable((By.CSS_SELECTOR, 'button[data-test="sidebar-button-save"]'))
-            )
+            save_clickable = EC.element_to_be_clickable((By.CSS_SELECTOR, 'button[data-test="sidebar-button-save"]'))
+            if self.adaptive_waits:
+                save_btn = self.waiter.until('save_button', save_clickable, 5)
+                if save_btn is None:
+                    raise TimeoutException("save button never became clickable")
+            else:
+                # Wait sebentar untuk save button muncul setelah accept
+                time.sleep(1)
+                save_btn = WebDriverWait(self.driver, 5).until(save_clickable)
 
             if save_btn.is_displayed() and save_btn.is_enabled():
                 self.driver.execute_script("arguments[0].scrollIntoView(true);", save_btn)
-                time.sleep(0.2)
+                self._pause(0.2, 'scroll')
                 save_btn.click()
                 print("   💾 Progress saved successfully")
-                time.sleep(1)
+                self._pause(1, 'save_done', element_disabled(save_btn), timeout=1)
                 return True
             else:
                 print("   ❌ Save button not visible or enabled")
@@ -301,7 +424,7 @@ class ProdigyHandler:
                 actions = ActionChains(self.driver)
                 actions.key_down(Keys.CONTROL).send_keys('s').key_up(Keys.CONTROL).perform()
                 print("   💾 Progress saved using Ctrl+S")
-                time.sleep(1)
+                self._pause(1, 'save_done')
                 return True
             except:
                 return False
@@ -347,6 +470,7 @@ class ProdigyHandler:
 
 
     
+    @timed('selenium.check_no_tasks')
     def check_no_tasks(self):
         try:
             # Check for the specific "No tasks available" message
@@ -380,10 +504,23 @@ class ProdigyHandler:
             return False
 
     
+    def unsaved_count(self):
+        try:
+            return self.driver.execute_script(UNSAVED_COUNT_SCRIPT)
+        except Exception:
+            return None
+
+    def report_timings(self):
+        if self.waiter:
+            self.waiter.report()
+        self.selector_cache.report()
+        if self.lifecycle:
+            self.lifecycle.report()
+    
     def close(self):
-        if self.driver:
+        if self.lifecycle:
             try:
-                self.driver.quit()
+                self.lifecycle.close()
                 print("   Browser closed successfully")
             except Exception as e:
                 print(f"   Error closing browser: {e}")
@@ -0,0 +1,85 @@
+import os
+
+import pytest
+
+from mock_prodigy import MOCK_DATASET, start_mock_server
+from prodigy_api import ProdigyAPIHandler, split_session_url
+
+TASKS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "valid_preprocess.csv")
+
+
+@pytest.fixture
+def server():
+    server = start_mock_server(TASKS_PATH, batch_size=4)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def server_url(server, session="mock"):
+    host, port = server.server_address[:2]
+    query = f"?session={session}" if session else ""
+    return f"http://{host}:{port}/{query}"
+
+
+def answer(handler, labels):
+    handler.get_current_text()
+    if labels:
+        assert handler.apply_labels_and_submit(labels)
+    else:
+        assert handler.click_ignore()
+
+
+def test_split_session_url():
+    assert split_session_url("http://localhost:8080/?session=alice") == ("http://localhost:8080/", "alice")
+    assert split_session_url("http://localhost:8080/prodigy") == ("http://localhost:8080/prodigy/", None)
+
+
+def test_session_id_joins_dataset_and_session(server):
+    assert ProdigyAPIHandler(server_url(server, "alice")).session_id == f"{MOCK_DATASET}-alice"
+    assert ProdigyAPIHandler(server_url(server, None)).session_id is None
+
+
+def test_tasks_are_fetched_a_batch_at_a_time(server):
+    handler = ProdigyAPIHandler(server_url(server))
+
+    assert handler.get_current_text() == server.state.tasks[0]['text'].strip()
+    assert server.state.position == 4
+    assert len(handler.queue) == 3
+
+    # Peeking past the queued tasks pulls exactly one more batch
+    texts = handler.peek_texts(6)
+    assert texts == [task['text'].strip() for task in server.state.tasks[:6]]
+    assert server.state.position == 8
+
+
+def test_answers_are_sent_in_bulk(server):
+    handler = ProdigyAPIHandler(server_url(server), batch_size=3)
+
+    answer(handler, ["fuel_positive"])
+    answer(handler, [])
+    assert server.state.answers == []
+    assert handler.unsaved_count() == 2
+
+    answer(handler, ["price_negative", "service_positive"])
+    assert handler.unsaved_count() == 0
+    assert [task['answer'] for task in server.state.answers] == ['accept', 'ignore', 'accept']
+    assert server.state.answers[0]['accept'] == ["FUEL_POSITIVE"]
+    assert server.state.answers[2]['accept'] == ["PRICE_NEGATIVE", "SERVICE_POSITIVE"]
+    assert [task['text'] for task in server.state.answers] == [task['text'] for task in server.state.tasks[:3]]
+
+
+def test_answers_are_requeued_when_saving_fails(server):
+    handler = ProdigyAPIHandler(server_url(server), batch_size=2)
+    server.state.failing_saves = 1
+
+    answer(handler, ["fuel_positive"])
+    answer(handler, ["machine_negative"])
+    assert server.state.answers == []
+    assert handler.unsaved_count() == 2
+
+    # The next flush sends the failed batch first, in order
+    answer(handler, [])
+    assert handler.auto_save_progress()
+    assert handler.unsaved_count() == 0
+    assert [task['text'] for task in server.state.answers] == [task['text'] for task in server.state.tasks[:3]]
@@ -0,0 +1,18 @@
+import pytest
+
+from benchmarks.startup import BUDGET_SECONDS, SCENARIOS, forbidden_imports, measure, warm_index
+
+
+@pytest.fixture(scope="module", autouse=True)
+def index_cache():
+    warm_index()
+
+
+@pytest.mark.parametrize("command", [command for _, command in SCENARIOS], ids=[name for name, _ in SCENARIOS])
+def test_cli_starts_within_budget(command):
+    # Best of three, so one slow run on a busy machine does not fail the budget
+    elapsed, imported = measure(command, runs=3)
+
+    assert imported, "no -X importtime output was captured"
+    assert forbidden_imports(imported) == []
+    assert elapsed <= BUDGET_SECONDS, f"{' '.join(command)} took {elapsed:.3f}s"
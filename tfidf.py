@@ -0,0 +1,127 @@
+import re
+
+import numpy as np
+from scipy import sparse
+
+# scikit-learn's default token_pattern
+TOKEN_PATTERN = re.compile(r"(?u)\b\w\w+\b")
+
+
+def murmurhash3_32(data, seed=0):
+    """Signed MurmurHash3 (x86, 32-bit) of ``data``, as scikit-learn's hashing uses it."""
+    c1, c2 = 0xcc9e2d51, 0x1b873593
+    h = seed & 0xffffffff
+    n_blocks = len(data) // 4
+
+    for block in range(n_blocks):
+        k = int.from_bytes(data[4 * block:4 * block + 4], 'little')
+        k = (k * c1) & 0xffffffff
+        k = ((k << 15) | (k >> 17)) & 0xffffffff
+        k = (k * c2) & 0xffffffff
+        h ^= k
+        h = ((h << 13) | (h >> 19)) & 0xffffffff
+        h = (h * 5 + 0xe6546b64) & 0xffffffff
+
+    tail = data[4 * n_blocks:]
+    if tail:
+        k = int.from_bytes(tail, 'little')
+        k = (k * c1) & 0xffffffff
+        k = ((k << 15) | (k >> 17)) & 0xffffffff
+        k = (k * c2) & 0xffffffff
+        h ^= k
+
+    h ^= len(data)
+    h ^= h >> 16
+    h = (h * 0x85ebca6b) & 0xffffffff
+    h ^= h >> 13
+    h = (h * 0xc2b2ae35) & 0xffffffff
+    h ^= h >> 16
+    return h - (1 << 32) if h & 0x80000000 else h
+
+
+def _tfidf_rows(indptr, indices, counts, idf, dtype=np.float64):
+    # Raw counts weighted by IDF, then each row scaled to unit L2 norm
+    n_rows = len(indptr) - 1
+    data = np.asarray(counts, dtype=np.float64) * idf[indices]
+    rows = np.repeat(np.arange(n_rows), np.diff(indptr))
+    norms = np.sqrt(np.bincount(rows, weights=data ** 2, minlength=n_rows))
+    data /= norms[rows]
+    return sparse.csr_matrix((data.astype(dtype, copy=False), indices, indptr), shape=(n_rows, len(idf)))
+
+
+class FrozenTfidf:
+    """Transform-only TF-IDF built from a fitted vocabulary and IDF vector.
+
+    Reproduces ``TfidfVectorizer.transform`` for the settings this project
+    uses (word n-grams, default token pattern, raw counts, L2 norm). Loading
+    a cached index therefore never has to import scikit-learn.
+    """
+
+    def __init__(self, vocabulary, idf, ngram_range=(1, 2), lowercase=True):
+        self.vocabulary_ = vocabulary
+        self.idf_ = idf
+        self.ngram_range = tuple(ngram_range)
+        self.lowercase = lowercase
+
+    def _features(self, text):
+        if self.lowercase:
+            text = text.lower()
+        tokens = TOKEN_PATTERN.findall(text)
+        min_n, max_n = self.ngram_range
+        for n in range(min_n, min(max_n, len(tokens)) + 1):
+            for start in range(len(tokens) - n + 1):
+                yield " ".join(tokens[start:start + n])
+
+    def _index(self, feature):
+        return self.vocabulary_.get(feature)
+
+    def _counts(self, texts):
+        indptr = [0]
+        indices = []
+        counts = []
+        for text in texts:
+            row = {}
+            for feature in self._features(text):
+                idx = self._index(feature)
+                if idx is not None:
+                    row[idx] = row.get(idx, 0) + 1
+            for idx in sorted(row):
+                indices.append(idx)
+                counts.append(row[idx])
+            indptr.append(len(indices))
+        return np.array(indptr, dtype=np.int32), np.array(indices, dtype=np.int32), counts
+
+    def transform(self, texts):
+        indptr, indices, counts = self._counts(texts)
+        return _tfidf_rows(indptr, indices, counts, self.idf_)
+
+
+class HashingTfidf(FrozenTfidf):
+    """TF-IDF over hashed n-grams: no vocabulary, one IDF weight per hash bucket.
+
+    Features map to ``abs(murmurhash3_32(feature)) % n_features`` exactly as
+    in scikit-learn's ``HashingVectorizer(alternate_sign=False)``, which is
+    used for the bulk counting when fitting.
+    """
+
+    def __init__(self, n_features, ngram_range=(1, 2), lowercase=True, idf=None):
+        super().__init__({}, idf, ngram_range, lowercase)
+        self.n_features = n_features
+
+    def _index(self, feature):
+        return abs(murmurhash3_32(feature.encode('utf-8'))) % self.n_features
+
+    def fit_transform(self, texts):
+        from sklearn.feature_extraction.text import HashingVectorizer
+
+        hasher = HashingVectorizer(
+            n_features=self.n_features, ngram_range=self.ngram_range, lowercase=self.lowercase,
+            alternate_sign=False, norm=None
+        )
+        counts = hasher.transform(texts).tocsr()
+        counts.sort_indices()
+
+        # Smoothed IDF, as TfidfTransformer computes it
+        document_frequency = np.bincount(counts.indices, minlength=self.n_features)
+        self.idf_ = np.log((1 + counts.shape[0]) / (1 + document_frequency)) + 1
+        return _tfidf_rows(counts.indptr, counts.indices, counts.data, self.idf_)
@@ -0,0 +1,103 @@
+import contextlib
+import io
+import multiprocessing as mp
+import time
+from urllib.parse import urlsplit, urlunsplit, parse_qs, urlencode
+
+from config import PRODIGY_URL, PRODIGY_SESSIONS, PARALLEL_WORKERS, ANNOTATION_BACKEND, RUN_JOURNAL_PATH
+from main import create_backend, run_full_automation
+from run_journal import RunJournal
+
+# Set once per worker process. With the fork start method the parent's fitted
+# RAGHandler is inherited copy-on-write instead of being pickled per worker.
+_worker_rag = None
+
+
+def session_url(url, session):
+    parts = urlsplit(url)
+    query = parse_qs(parts.query)
+    query['session'] = [session]
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query, doseq=True), parts.fragment))
+
+
+def worker_urls(url=PRODIGY_URL, sessions=PRODIGY_SESSIONS, workers=PARALLEL_WORKERS):
+    if sessions:
+        return [session_url(url, session) for session in sessions]
+    # Without explicit sessions every worker pulls from the same shared feed
+    return [url] * workers
+
+
+def journal_paths(journal_path, urls):
+    """One journal per worker, named after its session so reordering the URLs keeps each with its own."""
+    paths = []
+    for worker_id, url in enumerate(urls, start=1):
+        name = parse_qs(urlsplit(url).query).get('session', ["default"])[0]
+        # Workers sharing one feed only differ by position
+        if urls.count(url) > 1:
+            name = f"{name}-{worker_id}"
+        paths.append(f"{journal_path}.{name}")
+    return paths
+
+
+def _init_worker(rag):
+    global _worker_rag
+    rag.prediction_cache.detach()
+    _worker_rag = rag
+
+
+def _run_worker(args):
+    worker_id, backend_name, url, quiet, journal_path = args
+    start = time.perf_counter()
+    output = io.StringIO() if quiet else None
+
+    with contextlib.redirect_stdout(output) if quiet else contextlib.nullcontext():
+        prodigy = None
+        try:
+            prodigy = create_backend(backend_name, url)
+            journal = RunJournal(journal_path, session=url) if journal_path else None
+            stats = run_full_automation(prodigy, _worker_rag, journal=journal)
+        except Exception as e:
+            print(f"❌ Worker {worker_id} failed: {e}")
+            stats = {'tasks': 0, 'successes': 0, 'errors': 1}
+        finally:
+            if prodigy:
+                prodigy.close()
+
+    stats['worker'] = worker_id
+    stats['elapsed'] = time.perf_counter() - start
+    return stats
+
+
+def aggregate_stats(results):
+    totals = {
+        'workers': len(results),
+        'tasks': sum(r['tasks'] for r in results),
+        'successes': sum(r['successes'] for r in results),
+        'errors': sum(r['errors'] for r in results),
+        'elapsed': max((r['elapsed'] for r in results), default=0.0)
+    }
+    totals['tasks_per_sec'] = totals['tasks'] / totals['elapsed'] if totals['elapsed'] else 0.0
+    return totals
+
+
+def run_worker_pool(rag, urls, backend_name=ANNOTATION_BACKEND, quiet=False, journal_path=RUN_JOURNAL_PATH):
+    method = 'fork' if 'fork' in mp.get_all_start_methods() else 'spawn'
+    context = mp.get_context(method)
+    # Each worker resumes from its own session's journal file
+    paths = journal_paths(journal_path, urls) if journal_path else [None] * len(urls)
+    jobs = [(i + 1, backend_name, url, quiet, path) for i, (url, path) in enumerate(zip(urls, paths))]
+
+    print(f"\n👥 Starting {len(urls)} workers ({method})...")
+    with context.Pool(len(urls), initializer=_init_worker, initargs=(rag,)) as pool:
+        results = pool.map(_run_worker, jobs)
+
+    totals = aggregate_stats(results)
+    print(f"\n📈 Worker Pool Stats:")
+    for r in sorted(results, key=lambda r: r['worker']):
+        print(f"   Worker {r['worker']}: {r['tasks']} tasks, {r['successes']} successful, "
+              f"{r['errors']} errors in {r['elapsed']:.1f}s")
+    print(f"   Total tasks processed: {totals['tasks']}")
+    print(f"   Successful: {totals['successes']}")
+    print(f"   Total errors: {totals['errors']}")
+    print(f"   Throughput: {totals['tasks_per_sec']:.2f} tasks/sec")
+    return totals